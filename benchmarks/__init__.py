@@ -0,0 +1 @@
+"""Benchmarks of the add-on, runnable without Anki (see stubs.py)."""
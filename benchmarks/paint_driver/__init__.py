@@ -0,0 +1,247 @@
+"""Add-on driving Anki through the screens styled by Redesign.
+
+Installed into a temporary Anki base by benchmarks/paint_latency.py,
+do not install it into a real profile: it adds notes to the collection
+and closes Anki when done.
+
+For every screen, with Redesign off and on, it measures milliseconds
+from opening the screen to:
+    load_finished   loadFinished of the screen's webview (for the answer
+                    side, which is shown without loading a page, the
+                    round trip of a script run after showing it)
+    first_paint     the first paint of the screen after its page loaded
+
+Results are written as JSON to the path in REDESIGN_PAINT_OUTPUT.
+"""
+import json
+import os
+import sys
+from time import perf_counter
+
+import aqt
+from aqt import mw
+from aqt.qt import QApplication, QEvent, QObject, QTimer
+from anki.hooks import addHook
+
+OUTPUT = os.environ.get('REDESIGN_PAINT_OUTPUT', 'paint_latency.json')
+REPEATS = int(os.environ.get('REDESIGN_PAINT_REPEATS', 5))
+
+# time given to a screen to load and paint
+TIMEOUT = 10000
+# pause between measurements, letting Anki finish pending work
+SETTLE = 300
+NOTES = 20
+
+
+def create_collection():
+    """Add a deck with a few notes to the (empty) collection of the profile."""
+    col = mw.col
+    deck_id = col.decks.id('Redesign benchmark')
+    model = col.models.byName('Basic')
+    model['did'] = deck_id
+    col.models.setCurrent(model)
+
+    for i in range(NOTES):
+        note = col.newNote()
+        note['Front'] = '<b>Question %s</b><br><img src="missing.png">' % i
+        note['Back'] = '<i>Answer %s</i><ul><li>one</li><li>two</li></ul>' % i
+        col.addNote(note)
+
+    col.decks.select(deck_id)
+    col.reset()
+
+
+def redesign_app():
+    add_on = sys.modules.get('redesign')
+    return getattr(add_on, 'redesign', None)
+
+
+class Screen:
+    """How to open a screen, which of its widgets to observe and how to close it.
+
+    open() returns the widget in which painting is observed
+    and the webview of which loading is observed.
+    """
+
+    def __init__(self, name, open_screen, close=None, loads=True):
+        self.name = name
+        self.open = open_screen
+        self.close = close
+        self.loads = loads
+
+
+def move_to(state):
+    def open_screen():
+        mw.moveToState(state)
+        return mw.web, mw.web
+    return open_screen
+
+
+def show_answer():
+    if mw.state != 'review':
+        mw.moveToState('review')
+    mw.reviewer._showAnswer()
+    return mw.web, mw.web
+
+
+def open_dialog(name, web):
+    def open_screen():
+        dialog = aqt.dialogs.open(name, mw)
+        return dialog, web(dialog)
+    return open_screen
+
+
+def close_dialog(name):
+    def close():
+        dialog = aqt.dialogs._dialogs[name][1]
+        if dialog:
+            dialog.close()
+    return close
+
+
+# in order of opening: the reviewer loads its page when entered from the overview
+SCREENS = [
+    Screen('deck_browser', move_to('deckBrowser')),
+    Screen('overview', move_to('overview')),
+    Screen('review_question', move_to('review')),
+    Screen('review_answer', show_answer, loads=False),
+    Screen(
+        'browser',
+        open_dialog('Browser', lambda browser: browser.editor.web),
+        close_dialog('Browser')
+    ),
+    Screen(
+        'editor',
+        open_dialog('AddCards', lambda add_cards: add_cards.editor.web),
+        close_dialog('AddCards')
+    ),
+    Screen(
+        'stats',
+        open_dialog('DeckStats', lambda stats: stats.form.web),
+        close_dialog('DeckStats')
+    ),
+]
+
+
+class Measurement(QObject):
+    """Times load and first paint of a single opening of a screen."""
+
+    def __init__(self, screen, on_done):
+        super().__init__()
+        self.screen = screen
+        self.on_done = on_done
+        self.widget = None
+        self.web = None
+        self.loaded_at = None
+        self.painted_at = None
+        self.finished = False
+
+    def start(self):
+        # painting happens in children of webviews, hence the application-wide filter
+        QApplication.instance().installEventFilter(self)
+        self.started_at = perf_counter()
+        self.widget, self.web = self.screen.open()
+
+        if self.screen.loads:
+            self.web.loadFinished.connect(self.on_load_finished)
+        else:
+            self.web.evalWithCallback('1', lambda result: self.on_load_finished(True))
+
+        QTimer.singleShot(TIMEOUT, self.finish)
+
+    def on_load_finished(self, ok=True):
+        if self.loaded_at is None:
+            self.loaded_at = perf_counter()
+
+    def eventFilter(self, obj, event):
+        if (
+            event.type() == QEvent.Paint
+            and self.loaded_at is not None
+            and self.painted_at is None
+            and self.widget is not None
+            and (obj is self.widget or self.widget.isAncestorOf(obj))
+        ):
+            self.painted_at = perf_counter()
+            QTimer.singleShot(0, self.finish)
+        return False
+
+    def elapsed(self, moment):
+        if moment is None:
+            return None
+        return round((moment - self.started_at) * 1000, 3)
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        QApplication.instance().removeEventFilter(self)
+        if self.screen.loads:
+            try:
+                self.web.loadFinished.disconnect(self.on_load_finished)
+            except TypeError:
+                pass
+        if self.screen.close:
+            self.screen.close()
+        self.on_done({
+            'load_finished': self.elapsed(self.loaded_at),
+            'first_paint': self.elapsed(self.painted_at)
+        })
+
+
+class Driver:
+
+    def __init__(self):
+        self.results = {'off': {}, 'on': {}}
+        self.steps = [
+            (mode, screen)
+            for mode in ['off', 'on']
+            for _ in range(REPEATS)
+            for screen in SCREENS
+        ]
+        self.mode = None
+        self.measurement = None
+
+    def start(self):
+        if not redesign_app():
+            # Redesign loads with a delay after the profile
+            QTimer.singleShot(200, self.start)
+            return
+        create_collection()
+        self.next()
+
+    def set_mode(self, mode):
+        app = redesign_app()
+        app.config.enable_night_mode.value = mode == 'on'
+        app.refresh()
+        mw.moveToState('deckBrowser')
+        self.mode = mode
+
+    def next(self):
+        if not self.steps:
+            self.finish()
+            return
+        mode, screen = self.steps.pop(0)
+        if mode != self.mode:
+            self.set_mode(mode)
+
+        def on_done(result):
+            self.results[mode].setdefault(screen.name, []).append(result)
+            QTimer.singleShot(SETTLE, self.next)
+
+        self.measurement = Measurement(screen, on_done)
+        QTimer.singleShot(SETTLE, self.measurement.start)
+
+    def finish(self):
+        with open(OUTPUT, 'w') as f:
+            json.dump(self.results, f, indent=2)
+        mw.close()
+
+
+driver = Driver()
+
+
+def on_profile_loaded():
+    QTimer.singleShot(1000, driver.start)
+
+
+addHook('profileLoaded', on_profile_loaded)
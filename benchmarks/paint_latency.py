@@ -0,0 +1,168 @@
+"""Paint latency of screens styled by Redesign, measured in a real Anki.
+
+Sets up a temporary Anki base with a fresh profile, links the add-on
+and benchmarks/paint_driver into its add-ons folder and starts Anki
+offscreen (QT_QPA_PLATFORM=offscreen). The driver opens the deck browser,
+overview, reviewer (question and answer), browser, editor and stats
+screens with Redesign off and on, timing their load and first paint.
+
+Requires Anki 2.1 importable from the running interpreter (aqt package):
+
+    python -m benchmarks.paint_latency [--repeat 5] [-o results.json]
+        [--budget 50] [--budgets budgets.json]
+
+Reports, as JSON, the median milliseconds per screen and mode, and the
+overhead which Redesign adds. With a budget (one for all screens, in ms,
+or a file mapping screen names to ms) exits with status 1 if first paint
+overhead of any screen exceeds it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from os.path import dirname, abspath, join
+from shutil import rmtree
+from statistics import median
+from tempfile import mkdtemp
+
+root = dirname(dirname(abspath(__file__)))
+
+PROFILE = 'benchmark'
+
+ADD_ONS = {
+    'redesign': join(root, 'redesign'),
+    'redesign_paint_driver': join(root, 'benchmarks', 'paint_driver')
+}
+
+PREPARE_PROFILE = """
+import sys
+from aqt.profiles import ProfileManager
+
+pm = ProfileManager(sys.argv[1])
+pm.setupMeta()
+pm.meta['firstRun'] = False
+pm.meta['defaultLang'] = 'en'
+pm.create(sys.argv[2])
+pm.load(sys.argv[2])
+pm.save()
+"""
+
+RUN_ANKI = """
+import sys
+import aqt
+
+sys.argv = ['anki', '-b', sys.argv[1], '-p', sys.argv[2], '-l', 'en']
+aqt.run()
+"""
+
+
+def prepare_base():
+    base = mkdtemp(prefix='redesign-paint-')
+    add_ons = join(base, 'addons21')
+    os.makedirs(add_ons)
+    for name, path in ADD_ONS.items():
+        os.symlink(path, join(add_ons, name), target_is_directory=True)
+    subprocess.run([sys.executable, '-c', PREPARE_PROFILE, base, PROFILE], check=True)
+    return base
+
+
+def run_anki(base, output, repeat, timeout):
+    env = dict(
+        os.environ,
+        QT_QPA_PLATFORM='offscreen',
+        REDESIGN_PAINT_OUTPUT=output,
+        REDESIGN_PAINT_REPEATS=str(repeat)
+    )
+    subprocess.run([sys.executable, '-c', RUN_ANKI, base, PROFILE], env=env, timeout=timeout, check=True)
+
+
+def summarize(measurements):
+    """Medians per screen and mode and the overhead of Redesign."""
+    summary = {}
+
+    for screen in measurements['off']:
+        summary[screen] = {}
+        for metric in ['load_finished', 'first_paint']:
+            medians = {}
+            for mode in ['off', 'on']:
+                values = [
+                    result[metric]
+                    for result in measurements[mode].get(screen, [])
+                    if result[metric] is not None
+                ]
+                medians[mode] = median(values) if values else None
+            if None not in medians.values():
+                medians['overhead'] = round(medians['on'] - medians['off'], 3)
+            else:
+                medians['overhead'] = None
+            summary[screen][metric] = medians
+
+    return summary
+
+
+def over_budget(summary, budgets):
+    """Screens of which first paint overhead exceeds the budget."""
+    return {
+        screen: metrics['first_paint']['overhead']
+        for screen, metrics in summary.items()
+        if screen in budgets
+        and metrics['first_paint']['overhead'] is not None
+        and metrics['first_paint']['overhead'] > budgets[screen]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=int, default=600, help='seconds to wait for Anki')
+    parser.add_argument('--budget', type=float, help='allowed overhead of every screen, in ms')
+    parser.add_argument('--budgets', help='JSON file with allowed overhead per screen, in ms')
+    parser.add_argument('--keep', action='store_true', help='do not remove the temporary Anki base')
+    parser.add_argument('-o', '--output', help='write results to a file instead of stdout')
+    args = parser.parse_args()
+
+    base = prepare_base()
+    try:
+        measurements_path = join(base, 'measurements.json')
+        run_anki(base, measurements_path, args.repeat, args.timeout)
+        with open(measurements_path) as f:
+            measurements = json.load(f)
+    finally:
+        if not args.keep:
+            rmtree(base, ignore_errors=True)
+
+    summary = summarize(measurements)
+
+    budgets = {}
+    if args.budget is not None:
+        budgets = {screen: args.budget for screen in summary}
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets.update(json.load(f))
+
+    exceeded = over_budget(summary, budgets)
+
+    results = json.dumps(
+        {
+            'repeat': args.repeat,
+            'summary': summary,
+            'budgets': budgets,
+            'over_budget': exceeded,
+            'measurements': measurements
+        },
+        indent=2
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+    if exceeded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
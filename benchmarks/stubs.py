@@ -0,0 +1,230 @@
+"""Minimal stand-ins for aqt, anki and PyQt5.
+
+They provide just enough for the add-on to be imported and run without
+Anki or Qt: the main window with its screens and webviews, hooks, and
+permissive placeholders for everything else (widgets, dialogs, colors).
+Placeholders accept any call and attribute access, so what they return
+is meaningless - only the add-on's own code is being exercised.
+
+Stubs have to be installed before the add-on is imported:
+
+    from benchmarks import stubs
+    mw = stubs.install()
+"""
+import sys
+import types
+
+
+class Placeholder:
+    """Accepts any call, attribute access or operation."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Placeholder()
+
+    def __call__(self, *args, **kwargs):
+        return Placeholder()
+
+    def __or__(self, other):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __int__(self):
+        return 0
+
+    def __float__(self):
+        return 0.0
+
+    def __str__(self):
+        return ''
+
+    def __add__(self, other):
+        return other
+
+    __radd__ = __add__
+
+
+# names which the add-on looks up with hasattr() to recognize its own objects
+MARKERS = {
+    'wraps', 'appends_in_night_mode', 'replaces_in_night_mode',
+    'is_css', 'instance', 'members'
+}
+
+
+class StubClassMeta(type):
+
+    def __getattr__(cls, name):
+        if name.startswith('__') or name in MARKERS:
+            raise AttributeError(name)
+        return Placeholder()
+
+
+class StubClass(metaclass=StubClassMeta):
+    """Base of placeholder classes (widgets, dialogs) which can be subclassed"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        # used as a decorator, e.g. pyqtSlot()
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return Placeholder()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Placeholder()
+
+
+def stub_class(name, **attributes):
+    return StubClassMeta(name, (StubClass,), attributes)
+
+
+class StubModule(types.ModuleType):
+    """Module creating placeholder classes for capitalized names."""
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in MARKERS:
+            raise AttributeError(name)
+        if not name[0].isupper():
+            return StubClass()
+        cls = stub_class(name)
+        setattr(self, name, cls)
+        return cls
+
+
+def module(name, **attributes):
+    stub = StubModule(name)
+    stub.__path__ = []
+    stub.__dict__.update(attributes)
+    sys.modules[name] = stub
+    parent, _, child = name.rpartition('.')
+    if parent in sys.modules:
+        setattr(sys.modules[parent], child, stub)
+    return stub
+
+
+class WebView:
+
+    def stdHtml(self, body, css=None, js=None, head='', context=None):
+        return head + body
+
+    def eval(self, js):
+        pass
+
+
+class BottomBar:
+
+    def __init__(self):
+        self._centerBody = '<center id=outer></center>'
+        self.web = WebView()
+
+
+class Screen:
+
+    def __init__(self):
+        self._body = '<center>%(tree)s</center>'
+        self._centerBody = '<center></center>'
+        self.bottom = BottomBar()
+        self.web = WebView()
+
+    def refresh(self):
+        pass
+
+    def draw(self):
+        pass
+
+
+class Reviewer(Screen):
+    state = 'question'
+
+    def revHtml(self):
+        return '<div id=_mark>&#x2605;</div><div id=_flag>&#x2691;</div><div id=qa></div>'
+
+    def _bottomHTML(self):
+        return '<center id=outer><table id=innertable></table></center>'
+
+
+class MainWindow(StubClass):
+
+    def __init__(self):
+        self.toolbar = Screen()
+        self.reviewer = Reviewer()
+        self.deckBrowser = Screen()
+        self.overview = Screen()
+        self.web = WebView()
+        self.state = 'deckBrowser'
+        self.pm = types.SimpleNamespace(profile={}, name='benchmark')
+        self.col = None
+        # without web exports styles are inlined, rather than written to files
+        self.addonManager = None
+
+    def moveToState(self, state):
+        self.state = state
+
+    def devicePixelRatioF(self):
+        return 1.0
+
+
+def install_hooks():
+    hooks = {}
+
+    def addHook(name, function):
+        hooks.setdefault(name, []).append(function)
+
+    def runHook(name, *args):
+        for function in hooks.get(name, []):
+            function(*args)
+
+    def runFilter(name, value, *args):
+        for function in hooks.get(name, []):
+            value = function(value, *args)
+        return value
+
+    def wrap(old, new, pos='after'):
+        def repl(*args, **kwargs):
+            if pos == 'after':
+                old(*args, **kwargs)
+                return new(*args, **kwargs)
+            elif pos == 'before':
+                new(*args, **kwargs)
+                return old(*args, **kwargs)
+            else:
+                return new(_old=old, *args, **kwargs)
+        return repl
+
+    module('anki.hooks', addHook=addHook, runHook=runHook, runFilter=runFilter, wrap=wrap, hooks=hooks)
+
+
+def install():
+    """Register the stubs in sys.modules.
+
+    Returns:
+        the stub of the main window (aqt.mw)
+    """
+    module('PyQt5')
+    for name in ['QtCore', 'QtGui', 'QtWidgets']:
+        module('PyQt5.' + name)
+
+    module('anki', version='2.1.15')
+    install_hooks()
+    module('anki.lang', _=lambda text: text, getLang=lambda: 'en')
+    module('anki.stats', CollectionStats=stub_class('CollectionStats', css=''))
+    module('anki.latex', pngCommands=[[None, None]], svgCommands=[[None, None]])
+
+    mw = MainWindow()
+    module('aqt', mw=mw, appVersion='2.1.15')
+    module('aqt.editor', _html='<div>%s</div>')
+    for name in ['addcards', 'browser', 'clayout', 'deckbrowser', 'editcurrent', 'qt', 'stats', 'utils', 'webview']:
+        module('aqt.' + name)
+    progress = module('aqt.progress')
+    progress.ProgressManager = type('ProgressManager', (), {'ProgressDialog': stub_class('ProgressDialog')})
+
+    return mw
@@ -0,0 +1,216 @@
+"""Cost of styling: css generation, wrapped methods and (re)applying stylers.
+
+Runs the add-on on top of benchmarks/stubs.py, so neither Anki nor Qt
+is needed. Reports, as JSON:
+
+    css         every @css property, evaluated (empty cache) and cached
+    stylers     Styler.replace_attributes() and restore_attributes()
+    wrapped     revHtml, _bottomHTML and stdHtml with and without stylers
+    manager     StylingManager.replace() and restore()
+
+Times are in nanoseconds per call (best and median of the repeats),
+allocations are memory blocks allocated by a single call and the peak
+of memory traced during it, in bytes.
+
+    python -m benchmarks.styling [--repeat 5] [--number 200] [-o results.json]
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from gc import collect
+from os.path import dirname, abspath
+from statistics import median
+from time import perf_counter_ns
+
+from . import stubs
+
+root = dirname(dirname(abspath(__file__)))
+
+
+def timing(function, repeat, number):
+    """Time a function, returning nanoseconds per call."""
+    results = []
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        for _ in range(number):
+            function()
+        results.append((perf_counter_ns() - start) / number)
+    return {'best_ns': round(min(results)), 'median_ns': round(median(results))}
+
+
+def allocations(function):
+    """Count memory blocks allocated by a single call of the function."""
+    collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    function()
+    after = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    differences = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), 'lineno')
+    return {
+        'blocks': sum(difference.count_diff for difference in differences if difference.count_diff > 0),
+        'peak_bytes': peak
+    }
+
+
+def measure(function, repeat, number):
+    result = timing(function, repeat, number)
+    result.update(allocations(function))
+    return result
+
+
+def measure_pair(action, undo, repeat, number):
+    """Measure an action and the action undoing it, each on its own.
+
+    Both are called alternately, timing each of them separately.
+    """
+    results = {action: [], undo: []}
+    for _ in range(repeat):
+        totals = {action: 0, undo: 0}
+        for _ in range(number):
+            for function in [action, undo]:
+                start = perf_counter_ns()
+                function()
+                totals[function] += perf_counter_ns() - start
+        for function, total in totals.items():
+            results[function].append(total / number)
+
+    measured = []
+    for function, other in [(action, undo), (undo, action)]:
+        times = results[function]
+        result = {'best_ns': round(min(times)), 'median_ns': round(median(times))}
+        result.update(allocations(function))
+        other()
+        measured.append(result)
+    return measured
+
+
+def load_add_on():
+    mw = stubs.install()
+    sys.path.insert(0, root)
+
+    from redesign.redesign import Redesign
+
+    app = Redesign()
+    app.load()
+    app.config.enable_night_mode.value = True
+    app.refresh()
+    return mw, app
+
+
+def css_properties(repeat, number):
+    from redesign.internals import css
+
+    results = {}
+
+    for owner, name in css.registry:
+        instance = getattr(owner, 'instance', None)
+        if not instance:
+            continue
+        descriptor = owner.__dict__[name]
+        # entries loaded from the styles bundle would be used on first access
+        descriptor.preloaded.clear()
+
+        def evaluate():
+            descriptor.cache.pop(instance, None)
+            return getattr(instance, name)
+
+        def cached():
+            return getattr(instance, name)
+
+        key = owner.__name__ + '.' + name
+        results[key] = {
+            'evaluate': measure(evaluate, repeat, number),
+            'cached': measure(cached, repeat, number),
+            'length': len(getattr(instance, name))
+        }
+
+    return results
+
+
+def stylers(app, repeat, number):
+    results = {}
+
+    for styler in app.styles.stylers:
+        was_applied = styler.applied
+        styler.restore_attributes()
+
+        replaced, restored = measure_pair(
+            styler.replace_attributes,
+            styler.restore_attributes,
+            repeat, number
+        )
+        results[styler.name] = {
+            'replace_attributes': replaced,
+            'restore_attributes': restored
+        }
+
+        if was_applied:
+            styler.replace_attributes()
+
+    return results
+
+
+def wrapped_methods(mw, repeat, number):
+    calls = {
+        'Reviewer.revHtml': (mw.reviewer, 'revHtml', ()),
+        'Reviewer._bottomHTML': (mw.reviewer, '_bottomHTML', ()),
+        'AnkiWebView.stdHtml': (mw.web, 'stdHtml', ('<div id=qa></div>',))
+    }
+    results = {}
+
+    for key, (target, name, args) in calls.items():
+        wrapper = getattr(target, name)
+        original = getattr(wrapper, '__wrapped__', None)
+
+        results[key] = {
+            'wrapped': measure(lambda: wrapper(*args), repeat, number),
+            'original': measure(lambda: original(target, *args), repeat, number) if original else None
+        }
+
+    return results
+
+
+def styling_manager(app, repeat, number):
+    app.styles.restore()
+    replaced, restored = measure_pair(app.styles.replace, app.styles.restore, repeat, number)
+    app.styles.replace()
+
+    return {'replace': replaced, 'restore': restored}
+
+
+def run(repeat=5, number=200):
+    mw, app = load_add_on()
+    return {
+        'python': sys.version.split()[0],
+        'repeat': repeat,
+        'number': number,
+        'css': css_properties(repeat, number),
+        'stylers': stylers(app, repeat, number),
+        'wrapped': wrapped_methods(mw, repeat, number),
+        'manager': styling_manager(app, repeat, number)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('-o', '--output', help='write results to a file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args.repeat, args.number), indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Per-call overhead of methods wrapped by stylers.
+
+Compares the previous wrapping chain (anki.hooks.wrap, a callback closure
+and MethodType binding) with the flat wrappers generated by
+redesign/wrappers.py, both as compiled normally and with the timing used
+by diagnostics. Does not require Anki to be installed:
+
+    python benchmarks/wrapper_overhead.py
+"""
+import importlib.util
+from os.path import dirname, abspath, join
+from timeit import repeat
+from types import MethodType
+
+root = dirname(dirname(abspath(__file__)))
+spec = importlib.util.spec_from_file_location('wrappers', join(root, 'redesign', 'wrappers.py'))
+wrappers = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wrappers)
+
+
+def wrap(old, new, pos='after'):
+    """anki.hooks.wrap, as in Anki 2.1"""
+    def repl(*args, **kwargs):
+        if pos == 'after':
+            old(*args, **kwargs)
+            return new(*args, **kwargs)
+        elif pos == 'before':
+            new(*args, **kwargs)
+            return old(*args, **kwargs)
+        else:
+            return new(_old=old, *args, **kwargs)
+    return repl
+
+
+class Recorder:
+
+    def start(self, reader=None):
+        pass
+
+    def stop(self):
+        pass
+
+
+recorder = Recorder()
+
+
+class Reviewer:
+
+    def revHtml(self):
+        return '<div id=qa></div>'
+
+
+class ReviewerCards:
+    instance = None
+
+    def revHtml(self, reviewer, _old):
+        return _old(reviewer) + '<style></style>'
+
+    def after(self, reviewer):
+        return None
+
+
+ReviewerCards.instance = ReviewerCards()
+
+
+def legacy(target, key, hook, position):
+    """Wrapping as done by StylerMetaclass before (with dependency recording)."""
+    original = getattr(target, key).__func__
+
+    def raw_new(*args, **kwargs):
+        recorder.start(ReviewerCards.instance)
+        try:
+            return hook(ReviewerCards.instance, *args, **kwargs)
+        finally:
+            recorder.stop()
+
+    return MethodType(wrap(original, raw_new, position), target)
+
+
+def flat(target, key, hook, position, timed=False):
+    original = getattr(target, key).__func__
+    return wrappers.compile_wrapper(
+        key, original, hook, ReviewerCards, position,
+        wrappers.CallStats(), recorder, target=target, timed=timed
+    )
+
+
+def per_call(function, number=200000):
+    return min(repeat(function, number=number, repeat=15)) / number * 1e9
+
+
+def main():
+    reviewer = Reviewer()
+    baseline = per_call(reviewer.revHtml)
+    print(f'unwrapped call: {baseline:.0f} ns')
+
+    for position, hook in [('around', ReviewerCards.revHtml), ('after', ReviewerCards.after)]:
+        before = per_call(legacy(reviewer, 'revHtml', hook, position))
+        after = per_call(flat(reviewer, 'revHtml', hook, position))
+        timed = per_call(flat(reviewer, 'revHtml', hook, position, timed=True))
+        print(
+            f'{position:>6}: anki.hooks.wrap chain {before - baseline:.0f} ns, '
+            f'flat wrapper {after - baseline:.0f} ns '
+            f'({timed - baseline:.0f} ns timed, with diagnostics shown) of overhead per call'
+        )
+
+
+if __name__ == '__main__':
+    main()
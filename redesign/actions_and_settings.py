@@ -1,11 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QColorDialog
 
 from .internals import Setting, MenuAction, alert
 from .color_map import ColorMapWindow
+from .diagnostics import DiagnosticsWindow
 from .mode import ModeWindow
 from .selector import StylersSelectorWindow
 
@@ -28,7 +29,11 @@ class UserColorMap(Setting, MenuAction):
         self.window.show()
 
     def on_colors_changed(self):
-        self.app.refresh()
+        self.app.color_remapper.compile(self.value)
+        self.app.scheduler.request(changed={self.name})
+
+    def on_load(self):
+        self.app.color_remapper.compile(self.value)
 
 
 
@@ -48,7 +53,7 @@ class InvertImage(Setting, MenuAction):
 
     def action(self):
         self.value = not self.value
-        self.app.refresh()
+        self.app.scheduler.request(changed={self.name})
 
 
 
@@ -65,7 +70,7 @@ class InvertLatex(Setting, MenuAction):
 
     def action(self):
         self.value = not self.value
-        self.app.refresh()
+        self.app.scheduler.request(changed={self.name})
 
 
 
@@ -135,7 +140,7 @@ class ColorAction(Setting, MenuAction):
         qt_color = QColorDialog.getColor(qt_color_old)
         if qt_color.isValid():
             self.value = qt_color.name()
-            self.app.refresh()
+            self.app.scheduler.request(changed={self.name})
 
 class TextColor(ColorAction):
     """
@@ -225,16 +230,21 @@ class ActiveBackgroundColor(ColorAction):
     label = 'Set active color'
 
 
+# colors switched by the light and dark mode actions
+MODE_COLORS = {'color_p', 'color_b', 'color_c', 'color_t'}
+
+
 class LightColors(MenuAction):
     """Reset colors"""
     label = '&Light mode'
 
     def action(self):
-        self.app.config.color_p = self.app.config.color_p_light
-        self.app.config.color_b = self.app.config.color_b_light
-        self.app.config.color_c = self.app.config.color_c_light
-        self.app.config.color_t = self.app.config.color_t_light
-        self.app.refresh()
+        with self.app.scheduler.batch() as scheduler:
+            self.app.config.color_p = self.app.config.color_p_light
+            self.app.config.color_b = self.app.config.color_b_light
+            self.app.config.color_c = self.app.config.color_c_light
+            self.app.config.color_t = self.app.config.color_t_light
+            scheduler.request(changed=MODE_COLORS)
 
 
 
@@ -275,11 +285,12 @@ class DarkColors(MenuAction):
     label = '&Dark mode'
 
     def action(self):
-        self.app.config.color_p = self.app.config.color_p_dark
-        self.app.config.color_b = self.app.config.color_b_dark
-        self.app.config.color_c = self.app.config.color_c_dark
-        self.app.config.color_t = self.app.config.color_t_dark
-        self.app.refresh()
+        with self.app.scheduler.batch() as scheduler:
+            self.app.config.color_p = self.app.config.color_p_dark
+            self.app.config.color_b = self.app.config.color_b_dark
+            self.app.config.color_c = self.app.config.color_c_dark
+            self.app.config.color_t = self.app.config.color_t_dark
+            scheduler.request(changed=MODE_COLORS)
 
 
 
@@ -298,6 +309,23 @@ class About(MenuAction):
 
 
 
+class Diagnostics(MenuAction):
+    """Show counters and times of stylers (see diagnostics.collect())"""
+    window = None
+    label = 'Redesign &diagnostics...'
+
+    def action(self):
+        from aqt import mw as main_window
+
+        if not self.window:
+            self.window = DiagnosticsWindow(main_window, self.app)
+        else:
+            self.window.refresh()
+        self.window.show()
+
+
+
+
 class EnableInDialogs(Setting, MenuAction):
     """Switch for night mode in dialogs"""
     value = True
@@ -306,6 +334,7 @@ class EnableInDialogs(Setting, MenuAction):
 
     def action(self):
         self.value = not self.value
+        self.app.scheduler.request(changed={self.name})
 
 
 
@@ -316,7 +345,80 @@ class StyleScrollBars(Setting, MenuAction):
 
     def action(self):
         self.value = not self.value
-        self.app.refresh()
+        self.app.scheduler.request(changed={self.name})
+
+
+
+
+class NativePalette(Setting, MenuAction):
+    """Give colors to Qt widgets with an application-wide palette,
+    using style sheets only where a palette is not enough."""
+    value = False
+    label = 'Native &palette in dialogs'
+    checkable = True
+
+    def action(self):
+        self.value = not self.value
+        self.app.scheduler.request(changed={self.name})
+
+
+
+
+class LiveRestyle(Setting):
+    """Replace styles of displayed webviews in place on refresh,
+    instead of reloading the screens (see Styler.hot_swap())."""
+    value = True
+
+
+
+
+class LinkStylesheets(Setting):
+    """Serve styles of webviews as stylesheet files
+    (see ExternalStylesheets), instead of inlining them."""
+    value = True
+
+
+
+
+class LazyStylers(Setting):
+    """Postpone styling of dialogs (Browser, Editor, etc.) until
+    the first time they are opened (see Styler.activate())."""
+    value = True
+
+
+
+
+class PersistIcons(Setting):
+    """Save transformed icons (see IconCache) as PNG files in user_files,
+    so they do not need to be rendered again in the next session."""
+    value = False
+
+    def on_load(self):
+        self.app.icons.cache.persist = self.value
+
+
+
+
+class PreInvertImages(Setting):
+    """With "Invert images" enabled, link inverted copies of images generated
+    in the background (see ImageInverter), instead of inverting with css."""
+    value = False
+
+
+
+
+class IndexColors(Setting):
+    """Index colors used by notes and note types in the background
+    (see ColorInventory), after the profile gets loaded."""
+    value = False
+
+
+
+
+class SeedColorMap(Setting):
+    """Add dark counterparts of the indexed colors which are not mapped
+    yet to the map of colors (UserColorMap); implies IndexColors."""
+    value = False
 
 
 
@@ -354,7 +456,9 @@ class ModeSettings(Setting, MenuAction):
         self.app.update_menu()
 
     def update(self):
-        self.app.refresh()
+        # called on each tick of the time editors
+        self.app.scheduler.request()
+        self.app.config.state_on.update_state()
 
     @property
     def is_active(self):
@@ -369,6 +473,16 @@ class ModeSettings(Setting, MenuAction):
     def time(self, which):
         return datetime.strptime(self.value[which], '%H:%M').time()
 
+    def next_switch(self, now):
+        """The nearest moment after now at which is_active may change."""
+        moments = []
+        for which in ['start_at', 'end_at']:
+            moment = datetime.combine(now.date(), self.time(which))
+            if moment <= now:
+                moment += timedelta(days=1)
+            moments.append(moment)
+        return min(moments)
+
 
 
 
@@ -431,25 +545,55 @@ class StateSetting(Setting):
     def value(self, value):
         pass
 
+    # in the automatic mode the state is checked once the start or end
+    # time is reached; the timer is re-armed at least this often, so that
+    # changes of the system clock or sleep of the computer are noticed
+    longest_wait = timedelta(minutes=30)
+
+    # delay after the start/end time, so that is_active has already changed
+    switch_delay = timedelta(seconds=1)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # check the state every 60 seconds
-        # (maybe a bit suboptimal, but the most reliable)
         from aqt import mw as main_window
         self.timer = QTimer(main_window)
-        self.timer.setInterval(60 * 100)  # 1000 milliseconds
-        self.timer.timeout.connect(self.maybe_enable_maybe_disable)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.check)
+        main_window.app.applicationStateChanged.connect(self.on_application_state_changed)
 
     def on_load(self):
         if self.value:
             self.app.on()
 
         self.update_state()
-        self.timer.start()
 
     def on_save(self):
         self.timer.stop()
 
+    def check(self):
+        self.maybe_enable_maybe_disable()
+        self.schedule_check()
+
+    def schedule_check(self):
+        """Arm the timer for the next start or end of the automatic mode."""
+        self.timer.stop()
+
+        if self.mode_settings.mode != 'auto':
+            return
+
+        now = datetime.now()
+        wait = min(
+            self.mode_settings.next_switch(now) - now + self.switch_delay,
+            self.longest_wait
+        )
+        self.timer.start(int(wait.total_seconds() * 1000))
+
+    def on_application_state_changed(self, state):
+        # the computer could have been sleeping; check is the state still valid
+        if state == Qt.ApplicationActive and self.timer.isActive():
+            self.check()
+
     def maybe_enable_maybe_disable(self):
         if self.value != self.state:
             self.app.refresh()
@@ -457,6 +601,7 @@ class StateSetting(Setting):
 
     def update_state(self):
         self.state = self.value
+        self.schedule_check()
 
 
 
@@ -480,4 +625,5 @@ class DisabledStylers(Setting, MenuAction):
         self.window.show()
 
     def update(self):
-        self.app.refresh(reload=True)
+        # called for each checkbox, also when all get (un)checked at once
+        self.app.scheduler.request(reload=True)
@@ -0,0 +1,95 @@
+import json
+from hashlib import sha1
+from os import makedirs
+from os.path import dirname, abspath, join, isfile
+
+from .internals import css, fingerprint
+
+
+class StylesBundle:
+    """Rendered CSS/QSS of all css properties, persisted between sessions.
+
+    The bundle is stored in user_files, together with a key computed from
+    the add-on version and the configuration it was rendered for; a bundle
+    with a different key is ignored and re-rendered when saving.
+    """
+
+    def __init__(self, app, version):
+        self.app = app
+        self.version = version
+        self.loaded_key = None
+        self.loaded_entries = 0
+
+        add_on_path = dirname(abspath(__file__))
+        add_on_resources = join(add_on_path, 'user_files')
+        makedirs(add_on_resources, exist_ok=True)
+
+        self.path = join(add_on_resources, 'styles_bundle.json')
+
+    @property
+    def key(self):
+        config = self.app.config
+        settings = {
+            # aliased settings (see LightColors) are resolved by getattr
+            name: fingerprint(getattr(config, name).value)
+            for name in config.settings
+        }
+        state = [self.version, settings, self.app.icons.paths]
+        return sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+    def load(self):
+        """Restore cached styles if rendered for the current configuration."""
+        if not isfile(self.path):
+            return
+
+        try:
+            with open(self.path, encoding='utf-8') as bundle_file:
+                bundle = json.load(bundle_file)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(bundle, dict):
+            return
+        if bundle.get('version') != self.version or bundle.get('key') != self.key:
+            return
+
+        # the file could have been truncated or edited by hand
+        styles = bundle.get('styles')
+        if not isinstance(styles, dict):
+            return
+        styles = {
+            key: entry
+            for key, entry in styles.items()
+            if isinstance(entry, dict)
+            and isinstance(entry.get('value'), str)
+            and isinstance(entry.get('dependencies'), dict)
+        }
+
+        css.import_cache(styles)
+        self.loaded_key = bundle['key']
+        self.loaded_entries = len(styles)
+
+    def build(self):
+        """Render all css properties of the existing styles and stylers."""
+        for owner, name in css.registry:
+            if owner.instance:
+                getattr(owner.instance, name)
+
+    def save(self):
+        self.build()
+        styles = css.export_cache()
+        key = self.key
+
+        if key == self.loaded_key and len(styles) == self.loaded_entries:
+            return
+
+        bundle = {
+            'version': self.version,
+            'key': key,
+            'styles': styles
+        }
+        with open(self.path, 'w', encoding='utf-8') as bundle_file:
+            json.dump(bundle, bundle_file)
+
+        self.loaded_key = key
+        self.loaded_entries = len(styles)
@@ -0,0 +1,264 @@
+"""Index of colors hardcoded in the notes and note types of the collection.
+
+Colors used by fields (e.g. <font color="...">, style="background: ...")
+and by css and templates of note types are collected by a job running in
+the background, in chunks of notes, so that Anki stays responsive. The
+index is saved in user_files, together with the modification time of
+each note, so that in later sessions only new and edited notes are read.
+
+For each color a dark counterpart is computed (with inverted lightness),
+which can be used to seed the map of colors (UserColorMap).
+"""
+import colorsys
+import json
+import re
+from os import makedirs
+from os.path import dirname, abspath, join, isfile
+
+from PyQt5.QtCore import QTimer
+
+from .color_remapper import TAG, ATTRIBUTE, DECLARATION, COLOR, canonical
+
+# declarations of colors in css of note types
+CSS_DECLARATION = re.compile(r'(?:^|[;{])\s*(?:[\w-]*color|background)\s*:([^;}]*)', re.IGNORECASE)
+
+
+def colors_in_value(value, colors):
+    for match in COLOR.finditer(value):
+        code = canonical(match.group(0)) if not match.group(0).startswith('url(') else None
+        if code:
+            colors.add(code)
+
+
+def colors_in_html(html, colors=None):
+    """Canonical codes of colors given in attributes of html tags."""
+    colors = set() if colors is None else colors
+    for tag in TAG.finditer(html):
+        for attribute in ATTRIBUTE.finditer(tag.group(0)):
+            name, value = attribute.group(2).lower(), attribute.group(3).strip('"\'')
+            if name == 'color':
+                colors_in_value(value, colors)
+            else:
+                for declaration in DECLARATION.finditer(value):
+                    colors_in_value(declaration.group(2), colors)
+    return colors
+
+
+def colors_in_css(css, colors=None):
+    colors = set() if colors is None else colors
+    for declaration in CSS_DECLARATION.finditer(css):
+        colors_in_value(declaration.group(1), colors)
+    return colors
+
+
+def dark_counterpart(code):
+    """Color with the same hue and saturation, but inverted lightness.
+
+    Dark text on light background becomes light text on dark background,
+    so the contrast between colors is preserved.
+    """
+    red, green, blue = (int(code[i:i + 2], 16) / 255 for i in (1, 3, 5))
+    hue, lightness, saturation = colorsys.rgb_to_hls(red, green, blue)
+    red, green, blue = colorsys.hls_to_rgb(hue, 1 - lightness, saturation)
+    return '#%02x%02x%02x' % tuple(round(channel * 255) for channel in (red, green, blue)) + code[7:]
+
+
+class ColorInventory:
+    """Colors used in the collection of the current profile, indexed in the background."""
+
+    # notes read at once, and milliseconds to wait before reading more
+    chunk_size = 500
+    interval = 20
+    # modification times of notes listed at once
+    list_size = 5000
+
+    version = 1
+
+    def __init__(self, app, mw):
+        self.app = app
+        self.mw = mw
+        self.directory = join(dirname(abspath(__file__)), 'user_files')
+
+        # note id => [modification time, colors]
+        self.notes = {}
+        # note type id => [modification time, colors]
+        self.models = {}
+        # color => dark counterpart
+        self.dark = {}
+
+        self.pending = []
+        self.running = False
+        # notes are listed in chunks too, by id; None once all were listed
+        self.last_listed = None
+        self.listed = set()
+        # was anything added to or removed from the index since it was loaded
+        self.changed = False
+        self.timer = QTimer(mw)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.scan_chunk)
+
+    @property
+    def path(self):
+        profile = re.sub(r'\W', '_', self.mw.pm.name)
+        return join(self.directory, 'color_inventory-' + profile + '.json')
+
+    def load(self):
+        self.notes, self.models, self.dark = {}, {}, {}
+
+        if not isfile(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as inventory_file:
+                inventory = json.load(inventory_file)
+        except (OSError, ValueError):
+            return
+        if inventory.get('version') != self.version:
+            return
+
+        self.notes = inventory['notes']
+        self.models = inventory['models']
+        self.dark = inventory['dark']
+
+    def save(self):
+        inventory = {
+            'version': self.version,
+            'notes': self.notes,
+            'models': self.models,
+            'dark': self.dark
+        }
+        makedirs(self.directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as inventory_file:
+            json.dump(inventory, inventory_file)
+
+    def start(self):
+        """Index the notes and note types which changed since the last time."""
+        if self.running or not self.mw.col:
+            return
+        self.load()
+        self.changed = False
+        self.scan_models()
+
+        # even listing the notes takes a while in large collections
+        self.pending = []
+        self.last_listed = 0
+        self.listed = set()
+        self.running = True
+        self.timer.start(0)
+
+    def stop(self):
+        """Interrupt indexing; notes which were read already stay in the index."""
+        if not self.running:
+            return
+        self.timer.stop()
+        self.running = False
+        self.pending = []
+        self.last_listed = None
+        if self.changed:
+            self.save()
+
+    def scan_models(self):
+        models = {}
+        for model in self.mw.col.models.all():
+            model_id = str(model['id'])
+            known = self.models.get(model_id)
+            if known and known[0] == model['mod']:
+                models[model_id] = known
+                continue
+            colors = colors_in_css(model['css'])
+            for template in model['tmpls']:
+                colors_in_html(template['qfmt'], colors)
+                colors_in_html(template['afmt'], colors)
+            models[model_id] = [model['mod'], sorted(colors)]
+        if models != self.models:
+            self.changed = True
+        self.models = models
+
+    def list_chunk(self):
+        """Find notes which were added or edited since they were indexed, and forget deleted ones."""
+        rows = self.mw.col.db.all(
+            'select id, mod from notes where id > ? order by id limit ?',
+            self.last_listed, self.list_size
+        )
+        for note_id, mod in rows:
+            key = str(note_id)
+            self.listed.add(key)
+            if self.notes.get(key, [None])[0] != mod:
+                self.pending.append(note_id)
+
+        if len(rows) == self.list_size:
+            self.last_listed = rows[-1][0]
+            return
+
+        self.last_listed = None
+        for note_id in set(self.notes) - self.listed:
+            del self.notes[note_id]
+            self.changed = True
+        self.listed = set()
+
+    def scan_chunk(self):
+        if not self.running:
+            return
+        if not self.mw.col:
+            self.stop()
+            return
+
+        if self.last_listed is not None:
+            self.list_chunk()
+        else:
+            self.read_chunk()
+
+        if self.last_listed is not None or self.pending:
+            self.timer.start(self.interval)
+        else:
+            self.finish()
+
+    def read_chunk(self):
+        chunk = self.pending[:self.chunk_size]
+        del self.pending[:self.chunk_size]
+
+        rows = self.mw.col.db.all(
+            'select id, mod, flds from notes where id in (%s)' % ','.join(str(note_id) for note_id in chunk)
+        )
+        for note_id, mod, fields in rows:
+            self.notes[str(note_id)] = [mod, sorted(colors_in_html(fields))]
+            self.changed = True
+
+    def finish(self):
+        self.running = False
+        if self.changed:
+            self.update_counterparts()
+            self.save()
+            self.changed = False
+        if self.app.config.seed_color_map.value:
+            self.seed(self.app.config.user_color_map.value)
+
+    @property
+    def colors(self):
+        """Colors found in the collection: color => number of notes and note types using it."""
+        counts = {}
+        for _, colors in list(self.notes.values()) + list(self.models.values()):
+            for color in colors:
+                counts[color] = counts.get(color, 0) + 1
+        return counts
+
+    def update_counterparts(self):
+        """Compute dark counterparts of all the colors at once."""
+        colors = self.colors
+        self.dark = {
+            color: self.dark.get(color) or dark_counterpart(color)
+            for color in colors
+        }
+
+    def seed(self, color_map):
+        """Add colors which are not mapped yet to the map (color => color to use instead)."""
+        mapped = {canonical(color) or color for color in color_map}
+        added = {
+            color: dark
+            for color, dark in self.dark.items()
+            if color not in mapped and color != dark
+        }
+        if not added:
+            return
+        color_map.update(added)
+        self.app.color_remapper.compile(color_map)
+        self.app.scheduler.request(changed={'user_color_map'})
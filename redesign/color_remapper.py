@@ -0,0 +1,154 @@
+"""Swapping of colors in the html of cards, as specified by the user (UserColorMap).
+
+Rather than generating a css selector for every mapped color (which the
+browser would test against every element of the card), the html of the
+cards is rewritten once, when prepared for display. Colors are looked up
+in a dictionary, so the cost does not grow with the number of mappings.
+
+Colors are found in:
+    - color attribute (<font color="...">),
+    - color, background-color and background declarations of style attribute,
+and recognized in any form: #rgb, #rrggbb, #rrggbbaa, rgb(), rgba(), names.
+"""
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+from PyQt5.QtGui import QColor
+
+from .internals import fingerprint
+from .palette import parse_rgba
+
+TAG = re.compile(r'<[a-zA-Z][^>]*>')
+ATTRIBUTE = re.compile(r'''(\s(color|style)\s*=\s*)("[^"]*"|'[^']*'|[^\s"'>]+)''', re.IGNORECASE)
+DECLARATION = re.compile(r'((?:^|;)\s*(?:color|background-color|background)\s*:)([^;]*)', re.IGNORECASE)
+# addresses of background images are skipped, so that "red.png" stays intact
+COLOR = re.compile(r'url\([^)]*\)|#[0-9a-fA-F]{3,8}\b|rgba?\([^)]*\)|\b[a-zA-Z]+\b')
+HEX = re.compile(r'#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})')
+
+
+def hex_code(red, green, blue, alpha=255):
+    code = '#%02x%02x%02x' % (red, green, blue)
+    if alpha < 255:
+        code += '%02x' % alpha
+    return code
+
+
+@lru_cache(maxsize=1024)
+def canonical(color):
+    """Lowercase #rrggbb (or #rrggbbaa) code of a css color, None if not a color."""
+    text = color.strip().lower()
+
+    match = HEX.fullmatch(text)
+    if match:
+        digits = match.group(1)
+        if len(digits) <= 4:
+            digits = ''.join(digit * 2 for digit in digits)
+        if digits[6:] == 'ff':
+            digits = digits[:6]
+        return '#' + digits
+
+    rgba = parse_rgba(text)
+    if rgba:
+        red, green, blue, alpha = rgba
+        return hex_code(red, green, blue, round(alpha * 255))
+
+    if text.isalpha() and QColor.isValidColor(text):
+        qt_color = QColor(text)
+        return hex_code(qt_color.red(), qt_color.green(), qt_color.blue(), qt_color.alpha())
+
+    return None
+
+
+class ColorRemapper:
+    """Rewrites colors in the html of cards, with the results kept in a LRU cache."""
+
+    def __init__(self, max_entries=256):
+        # canonical code of a color => color to use instead
+        self.mapping = {}
+        self.fingerprint = None
+        self.max_entries = max_entries
+        # key => (html, rewritten html)
+        self.cache = OrderedDict()
+
+    def compile(self, color_map):
+        """Prepare lookups for given map: color => color to use instead."""
+        self.mapping = {
+            canonical(old) or old.strip().lower(): new
+            for old, new in color_map.items()
+            if old and new
+        }
+        self.fingerprint = fingerprint(color_map)
+        self.cache.clear()
+
+    def replacement(self, match):
+        color = match.group(0)
+        if color.startswith('url('):
+            return color
+        return self.mapping.get(canonical(color), color)
+
+    def remap_declaration(self, match):
+        return match.group(1) + COLOR.sub(self.replacement, match.group(2))
+
+    def remap_attribute(self, match):
+        prefix, name, value = match.groups()
+        quote = value[0] if value[0] in '"\'' else ''
+        if quote:
+            value = value[1:-1]
+
+        if name.lower() == 'color':
+            new = self.mapping.get(canonical(value))
+            if new is None:
+                return match.group(0)
+            value = new
+        else:
+            value = DECLARATION.sub(self.remap_declaration, value)
+
+        return prefix + quote + value + quote
+
+    def remap_tag(self, match):
+        tag = match.group(0)
+        lowercase = tag.lower()
+        if 'color' not in lowercase and 'background' not in lowercase:
+            return tag
+        return ATTRIBUTE.sub(self.remap_attribute, tag)
+
+    def remap(self, html, key=None):
+        """Html with colors swapped.
+
+        Args:
+            html: html to rewrite
+            key: identifies the html for the cache; as the same card may
+                be rendered differently (e.g. with a typed answer), cached
+                results are used only if the html is the same as well
+        """
+        if not self.mapping:
+            return html
+
+        if key is not None:
+            key += (self.fingerprint,)
+            cached = self.cache.get(key)
+            if cached and cached[0] == html:
+                self.cache.move_to_end(key)
+                return cached[1]
+
+        remapped = TAG.sub(self.remap_tag, html)
+
+        if key is not None:
+            self.cache[key] = (html, remapped)
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+        return remapped
+
+    @staticmethod
+    def card_key(card, context):
+        """Identifies the html of a side of a card, as long as templates and fields do not change."""
+        try:
+            note = card.note()
+            return card.id, context, card.model()['mod'], note.mod
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def remap_card(self, html, card, context):
+        return self.remap(html, self.card_key(card, context))
@@ -1,5 +1,5 @@
 from aqt import mw
-from .internals import Setting
+from .internals import Setting, config_reads
 
 
 class Config:
@@ -45,10 +45,18 @@ class Config:
 
 
 class ConfigValueGetter:
+    """Gives access to values of settings.
 
-    def __init__(self, config):
+    Every read is reported to the dependency recorder, so that when a
+    setting changes only the styles and stylers which use it get updated.
+    """
+
+    def __init__(self, config, reader=None):
         self.config = config
+        self.reader = reader
 
     def __getattr__(self, attr):
         setting = getattr(self.config, attr)
-        return setting.value
+        value = setting.value
+        config_reads.record(attr, value, self.reader)
+        return value
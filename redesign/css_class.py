@@ -1,3 +1,6 @@
+import json
+
+
 def inject_css_class(state: bool, html: str):
     if state:
         javascript = """
@@ -29,3 +32,88 @@ def inject_css_class(state: bool, html: str):
     # before any user-defined, potentially malformed HTML
     html = f"<script>{javascript}</script>" + html
     return html
+
+
+def toggle_css_class(state: bool):
+    """JavaScript adding or removing "anki_redesign" class of the body."""
+    return f'document.body.classList.toggle("anki_redesign", {json.dumps(state)});'
+
+
+def keep_css_class(state: bool):
+    """JavaScript keeping "anki_redesign" class on the body for the lifetime of the page.
+
+    Pages which replace the class of the body (as the reviewer does on each
+    card) would drop the class; an observer adds it back, as long as the
+    root element has "data-anki-redesign" attribute. The observer is set
+    up once per page; further calls only add or remove the attribute.
+    """
+    return """
+        (function(state){
+            var root = document.documentElement;
+            if(state) root.setAttribute('data-anki-redesign', '');
+            else root.removeAttribute('data-anki-redesign');
+
+            function apply(){
+                var on = root.hasAttribute('data-anki-redesign');
+                if(document.body.classList.contains('anki_redesign') !== on)
+                    document.body.classList.toggle('anki_redesign', on);
+            }
+
+            if(!window.redesignBodyClass){
+                window.redesignBodyClass = new MutationObserver(apply);
+                window.redesignBodyClass.observe(document.body, {attributes: true, attributeFilter: ['class']});
+            }
+            apply();
+        })(%s);
+        """ % json.dumps(state)
+
+
+def replace_style_element(element_id: str, css: str = None, href: str = None):
+    """JavaScript replacing a <style> element (or a stylesheet <link>) in a live webview.
+
+    The element will be created if the page was rendered without it,
+    or removed if no css is given. If href is given, the css is linked
+    from that address instead of being inlined.
+    """
+    return """
+        (function(id, css, href){
+            var element = document.getElementById(id);
+            if(css === null){
+                if(element) element.remove();
+                return;
+            }
+            var tag = href ? 'link' : 'style';
+            if(!element || element.tagName.toLowerCase() !== tag){
+                var replacement = document.createElement(tag);
+                replacement.id = id;
+                if(href) replacement.rel = 'stylesheet';
+                if(element) element.replaceWith(replacement);
+                else document.head.appendChild(replacement);
+                element = replacement;
+            }
+            if(href) element.href = href;
+            else element.textContent = css;
+        })(%s, %s, %s);
+        """ % (json.dumps(element_id), json.dumps(css), json.dumps(href))
+
+
+def replace_tokens(css: str):
+    """JavaScript replacing definitions of the color tokens in a live webview.
+
+    Pages may include the tokens more than once (each styler injects them
+    with its styles); all the elements are updated.
+    """
+    return """
+        (function(css){
+            var elements = document.querySelectorAll('style.redesign-tokens');
+            if(!elements.length){
+                var element = document.createElement('style');
+                element.className = 'redesign-tokens';
+                document.head.insertBefore(element, document.head.firstChild);
+                elements = [element];
+            }
+            for(var i = 0; i < elements.length; i++){
+                elements[i].textContent = css;
+            }
+        })(%s);
+        """ % json.dumps(css)
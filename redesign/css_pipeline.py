@@ -0,0 +1,169 @@
+"""Post-processing of generated CSS before it gets injected into webviews.
+
+Styles are composed from fragments (e.g. buttons, colors replacer) which
+repeat within a single page, and are written for readability - indented
+and commented. Here they are reduced to what QtWebEngine has to parse:
+    - comments and redundant whitespace are stripped,
+    - exact duplicates of rules are dropped (the last one is kept,
+      so the result of the cascade does not change),
+    - adjacent rules with the same selector are merged,
+    - optionally, rules which are already present on the page are dropped.
+
+This module does not depend on Anki.
+"""
+import re
+from functools import lru_cache
+
+STRINGS_AND_COMMENTS = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|/\*.*?\*/''', re.DOTALL)
+WHITESPACE = re.compile(r'\s+')
+AROUND_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+AFTER_COLON = re.compile(r':\s+')
+BEFORE_COLON = re.compile(r'\s+:')
+STYLE_ELEMENTS = re.compile(r'<style[^>]*>(.*?)</style>', re.DOTALL | re.IGNORECASE)
+
+
+def minify(css):
+    """Strip comments and whitespace which does not change the meaning."""
+    parts = []
+    # text between strings, with comments dropped
+    text = ''
+    position = 0
+
+    for match in STRINGS_AND_COMMENTS.finditer(css):
+        text += css[position:match.start()]
+        # strings are kept intact, comments dropped
+        if match.group(1):
+            parts.append(compact(text))
+            parts.append(match.group(1))
+            text = ''
+        position = match.end()
+
+    parts.append(compact(text + css[position:]))
+
+    return ''.join(parts).strip()
+
+
+def compact(text):
+    """Minify text outside of strings."""
+    text = WHITESPACE.sub(' ', text)
+    text = AROUND_PUNCTUATION.sub(r'\1', text)
+    text = AFTER_COLON.sub(':', text)
+    # the last declaration of a block does not need a semicolon
+    return text.replace(';}', '}')
+
+
+def tighten_declarations(declarations):
+    """Strip spaces before colons (which matter in selectors, but not in declarations)."""
+    if ' :' not in declarations:
+        return declarations
+    parts = []
+    position = 0
+    for match in STRINGS_AND_COMMENTS.finditer(declarations):
+        parts.append(BEFORE_COLON.sub(':', declarations[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(BEFORE_COLON.sub(':', declarations[position:]))
+    return ''.join(parts)
+
+
+def split_rules(css):
+    """Split minified css into top-level items.
+
+    Returns:
+        list of (selector, declarations) for style rules and
+        (None, text) for anything else (at-rules, statements),
+        or None if braces are not balanced
+    """
+    items = []
+    depth = 0
+    start = 0
+    opening = None
+    quote = None
+
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                opening = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return None
+            if depth == 0:
+                prelude = css[start:opening].strip()
+                if prelude.startswith('@'):
+                    items.append((None, css[start:i + 1]))
+                else:
+                    items.append((prelude, tighten_declarations(css[opening + 1:i])))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            items.append((None, css[start:i + 1]))
+            start = i + 1
+
+    if depth or quote:
+        return None
+
+    if css[start:].strip():
+        items.append((None, css[start:]))
+
+    return items
+
+
+def rule_text(item):
+    selector, body = item
+    if selector is None:
+        return body
+    return selector + '{' + body + '}'
+
+
+@lru_cache(maxsize=128)
+def page_rules(page_css):
+    """Texts of (minified) rules of css present on a page."""
+    items = split_rules(minify(page_css))
+    return frozenset(rule_text(item) for item in items or [])
+
+
+def page_rules_of_html(html):
+    """Texts of rules in all <style> elements of given html."""
+    return page_rules(''.join(STYLE_ELEMENTS.findall(html)))
+
+
+@lru_cache(maxsize=256)
+def optimize(css, present=frozenset()):
+    """Minify css, deduplicate and merge its rules.
+
+    Args:
+        css: text of a stylesheet
+        present: texts of rules which are already on the page
+            (later in the document), as returned by page_rules()
+    """
+    minified = minify(css)
+    items = split_rules(minified)
+
+    if items is None:
+        return minified
+
+    # drop duplicates, keeping the last occurrence
+    texts = [rule_text(item) for item in items]
+    last = {text: i for i, text in enumerate(texts)}
+    unique = [
+        item
+        for i, (item, text) in enumerate(zip(items, texts))
+        if last[text] == i and text not in present
+    ]
+
+    merged = []
+    for selector, body in unique:
+        if selector is not None and not body:
+            continue
+        if merged and selector is not None and merged[-1][0] == selector:
+            merged[-1] = (selector, merged[-1][1] + ';' + body)
+        else:
+            merged.append((selector, body))
+
+    return ''.join(rule_text(item) for item in merged)
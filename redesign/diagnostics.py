@@ -0,0 +1,186 @@
+import json
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QPlainTextEdit, QFileDialog
+
+from .gui import create_button, AddonDialog
+from .internals import css
+from .languages import _
+
+
+def css_stats(obj):
+    """Evaluations of css properties of given styler or style."""
+    stats = {}
+    for owner, name in css.registry:
+        evaluations = owner.__dict__[name].stats.get(obj)
+        if evaluations:
+            stats[name] = evaluations.as_dict()
+    return stats
+
+
+def collect(app):
+    """Counters and cumulative times (in seconds) of all stylers and styles."""
+    stylers = {}
+
+    for styler in app.styles.stylers:
+        stylers[type(styler).__name__] = {
+            'active': styler.is_active,
+            'applied': styler.applied,
+            'replace_attributes': styler.replace_stats.as_dict(),
+            'restore_attributes': styler.restore_stats.as_dict(),
+            'wraps': {
+                key: stats.as_dict()
+                for key, stats in styler.wrapper_stats.items()
+            },
+            'css': css_stats(styler),
+            'injected_bytes': styler.injected_bytes,
+            'errors': styler.errors
+        }
+
+    styles = {
+        style.__name__: css_stats(style.instance)
+        for style in app.styles.styles
+        if getattr(style, 'instance', None)
+    }
+
+    refreshes = {
+        'requested': app.scheduler.requested,
+        'performed': app.scheduler.performed
+    }
+
+    return {'stylers': stylers, 'styles': styles, 'refreshes': refreshes, 'note': TIMING_NOTE}
+
+
+def reset(app):
+    for styler in app.styles.stylers:
+        styler.replace_stats.reset()
+        styler.restore_stats.reset()
+        for stats in styler.wrapper_stats.values():
+            stats.reset()
+        styler.injected_bytes = 0
+        styler.errors.clear()
+
+    app.scheduler.requested = 0
+    app.scheduler.performed = 0
+
+    for owner, name in css.registry:
+        owner.__dict__[name].stats.clear()
+
+
+# calls are counted all the time, timing costs more on every call
+TIMING_NOTE = (
+    'Calls of wrapped methods and css evaluations are counted since Anki started '
+    '(or the last reset); their times are measured only while this window is open.'
+)
+
+
+def enable_timing(app, timed):
+    """Time calls of wrapped methods and css evaluations (only while diagnostics are shown)."""
+    css.timed = timed
+    for styler in app.styles.stylers:
+        styler.time_wrappers(timed)
+
+
+def total_time(styler_report):
+    times = [
+        styler_report['replace_attributes']['time'],
+        styler_report['restore_attributes']['time']
+    ]
+    times.extend(stats['time'] for stats in styler_report['wraps'].values())
+    times.extend(stats['time'] for stats in styler_report['css'].values())
+    return sum(times)
+
+
+def milliseconds(stats):
+    return '%d x %.2f ms' % (stats['calls'], stats['time'] * 1000)
+
+
+def summary(report):
+    """Human-readable summary, with the most time-consuming stylers first."""
+    lines = [TIMING_NOTE, '']
+    stylers = sorted(
+        report['stylers'].items(),
+        key=lambda item: total_time(item[1]),
+        reverse=True
+    )
+
+    for name, styler in stylers:
+        state = 'applied' if styler['applied'] else ('active' if styler['active'] else 'disabled')
+        lines.append(
+            '%s (%s): %.2f ms, %d bytes injected' %
+            (name, state, total_time(styler) * 1000, styler['injected_bytes'])
+        )
+        for method in ['replace_attributes', 'restore_attributes']:
+            if styler[method]['calls']:
+                lines.append('    %s: %s' % (method, milliseconds(styler[method])))
+        for key, stats in styler['wraps'].items():
+            if stats['calls']:
+                lines.append('    %s.%s: %s' % (name, key, milliseconds(stats)))
+        for key, stats in styler['css'].items():
+            lines.append('    css %s: %s' % (key, milliseconds(stats)))
+        for error in styler['errors']:
+            lines.append('    error: ' + error)
+
+    lines.append('')
+    lines.append('refreshes: %(performed)d performed of %(requested)d requested' % report['refreshes'])
+    for name, properties in report['styles'].items():
+        for key, stats in properties.items():
+            lines.append('%s.%s: %s' % (name, key, milliseconds(stats)))
+
+    return '\n'.join(lines)
+
+
+class DiagnosticsWindow(AddonDialog):
+
+    def __init__(self, parent, app, title=_('Redesign diagnostics')):
+        super().__init__(self, parent, Qt.Window)
+        self.app = app
+        self.text = None
+        self.init_ui(title)
+
+    def init_ui(self, title):
+        self.setWindowTitle(title)
+
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont('monospace'))
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(create_button('Refresh', self.refresh))
+        buttons.addWidget(create_button('Reset', self.reset))
+        buttons.addWidget(create_button('Save as JSON', self.save))
+        buttons.addWidget(create_button('Close', self.close))
+        buttons.setAlignment(Qt.AlignBottom)
+
+        body = QVBoxLayout()
+        body.addWidget(self.text)
+        body.addLayout(buttons)
+        self.setLayout(body)
+
+        self.setGeometry(300, 300, 700, 500)
+        self.refresh()
+        self.show()
+
+    def showEvent(self, event):
+        enable_timing(self.app, True)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        enable_timing(self.app, False)
+        super().hideEvent(event)
+
+    def refresh(self):
+        self.text.setPlainText(summary(collect(self.app)))
+
+    def reset(self):
+        reset(self.app)
+        self.refresh()
+
+    def save(self):
+        path, _filter = QFileDialog.getSaveFileName(
+            self, _('Save diagnostics'), 'redesign_diagnostics.json', 'JSON (*.json)'
+        )
+        if path:
+            with open(path, 'w') as f:
+                json.dump(collect(self.app), f, indent=2)
@@ -0,0 +1,98 @@
+import json
+from weakref import WeakKeyDictionary
+
+
+# Chromium wraps text in <span style="background-color: rgb(255, 255, 255);">
+# (or <strong>) when lines of a field get joined with backspace/delete or
+# text gets pasted, because it preserves the computed background of the
+# text - which is white on Anki's own pages. The observer removes such
+# backgrounds from the changed nodes only, modifying them in place, so
+# neither the field has to be serialized, nor the caret restored.
+#
+# The observer is installed only if it is not on the page yet (the page
+# could have been reloaded since), otherwise it is just enabled or disabled.
+CLEANER = """
+(function(enabled){
+    if(window.redesignBackgroundCleaner){
+        window.redesignBackgroundCleaner.enabled = enabled;
+        return;
+    }
+
+    var WHITE = 'rgb(255, 255, 255)';
+    var FIELD_ELEMENTS = '.field span[style], .field strong[style]';
+    var cleaner = window.redesignBackgroundCleaner = {enabled: enabled};
+
+    function clean(element){
+        if(element.tagName !== 'SPAN' && element.tagName !== 'STRONG')
+            return;
+        if(element.style.backgroundColor !== WHITE)
+            return;
+        element.style.removeProperty('background-color');
+        if(!element.getAttribute('style'))
+            element.removeAttribute('style');
+    }
+
+    function inField(element){
+        return element.closest('.field') !== null;
+    }
+
+    function cleanTree(element){
+        if(inField(element))
+            clean(element);
+        var elements = element.querySelectorAll(FIELD_ELEMENTS);
+        for(var i = 0; i < elements.length; i++)
+            clean(elements[i]);
+    }
+
+    var observer = new MutationObserver(function(mutations){
+        if(!cleaner.enabled) return;
+
+        for(var i = 0; i < mutations.length; i++){
+            var mutation = mutations[i];
+            if(mutation.type === 'attributes'){
+                if(inField(mutation.target))
+                    clean(mutation.target);
+                continue;
+            }
+            var nodes = mutation.addedNodes;
+            for(var j = 0; j < nodes.length; j++){
+                if(nodes[j].nodeType === Node.ELEMENT_NODE)
+                    cleanTree(nodes[j]);
+            }
+        }
+    });
+
+    observer.observe(document.body, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ['style']
+    });
+})(%s);
+"""
+
+SET_ENABLED = """
+if(window.redesignBackgroundCleaner)
+    window.redesignBackgroundCleaner.enabled = %s;
+"""
+
+
+class BackgroundCleaner:
+    """Removes white backgrounds which Chromium adds when editing fields.
+
+    The cleaner stays on the page of an editor across notes, but the page
+    can get reloaded; while Redesign is on, the guarded script is sent with
+    each note, and it installs the cleaner again if it went missing. When
+    Redesign gets switched off, the cleaner is only disabled.
+    """
+
+    def __init__(self):
+        # editor webview => was the cleaner enabled there
+        self.webs = WeakKeyDictionary()
+
+    def update(self, web, enabled):
+        if enabled:
+            web.eval(CLEANER % json.dumps(enabled))
+        elif self.webs.get(web):
+            web.eval(SET_ENABLED % json.dumps(enabled))
+        self.webs[web] = enabled
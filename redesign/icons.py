@@ -1,6 +1,10 @@
+from collections import OrderedDict
+from hashlib import sha1
 from os import makedirs
 from os.path import isfile, dirname, abspath, join
-from PyQt5.QtGui import QIcon, QPixmap
+from aqt import appVersion
+from PyQt5.QtCore import QFile
+from PyQt5.QtGui import QIcon, QPixmap, QImage
 from PyQt5.QtWidgets import QStyle
 
 
@@ -14,17 +18,99 @@ def inverted_icon(icon, width=32, height=32, as_image=False):
     return new_icon
 
 
+def invert_pixels(image):
+    image.invertPixels()
+    return image
+
+
+# transforms which can be applied to images rendered from icons
+TRANSFORMS = {
+    'plain': lambda image: image,
+    'inverted': invert_pixels
+}
+
+# icons shown in the sidebar of the Browse window
+SIDEBAR_ICONS = [
+    ':/icons/' + name + '.svg'
+    for name in ['collection', 'deck', 'heart', 'notetype', 'tag', 'flag']
+]
+
+
+class IconCache:
+    """Process-wide cache of transformed icons, with LRU eviction.
+
+    Entries are keyed by the icon reference (a resource path), device
+    pixel ratio and the name of the transform. Icons without a reference
+    are transformed on each request: Qt creates a new QIcon (with a new
+    cacheKey()) whenever an icon is asked for, so they would never be hit.
+
+    Icons can also be persisted as PNG files, so they are not rendered
+    again next session. As the resources come with Anki, the files are
+    named with the version of Anki too.
+    """
+
+    def __init__(self, path, size=32, max_entries=512, version=''):
+        self.path = path
+        self.size = size
+        self.max_entries = max_entries
+        self.version = version
+        self.entries = OrderedDict()
+        self.persist = False
+
+    def render(self, icon, transform, ratio=1.0):
+        size = round(self.size * ratio)
+        image = TRANSFORMS[transform](icon.pixmap(size, size).toImage())
+        image.setDevicePixelRatio(ratio)
+        return image
+
+    def get(self, icon, transform, ref=None, ratio=1.0):
+        if ref is None:
+            return QIcon(QPixmap.fromImage(self.render(icon, transform, ratio)))
+
+        key = (ref, ratio, transform)
+
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.entries.move_to_end(key)
+            return cached
+
+        image = None
+        file_path = None
+
+        if self.persist:
+            file_name = sha1(repr(key + (self.version,)).encode()).hexdigest() + '.png'
+            file_path = join(self.path, file_name)
+            if isfile(file_path):
+                image = QImage(file_path)
+                image.setDevicePixelRatio(ratio)
+
+        if not image or image.isNull():
+            image = self.render(icon, transform, ratio)
+            if file_path:
+                image.save(file_path)
+
+        new_icon = QIcon(QPixmap.fromImage(image))
+        self.entries[key] = new_icon
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return new_icon
+
+
 class Icons:
 
     paths = {}
 
     def __init__(self, mw):
 
+        self.mw = mw
+
         add_on_path = dirname(abspath(__file__))
         add_on_resources = join(add_on_path, 'user_files')
         icons_path = join(add_on_resources, 'icons')
         makedirs(icons_path, exist_ok=True)
 
+        self.cache = IconCache(icons_path, version=appVersion)
+
         icon_path = join(icons_path, 'arrow.png')
 
         if not isfile(icon_path):
@@ -55,3 +141,13 @@ class Icons:
     @property
     def arrow(self):
         return self.paths['arrow']
+
+    def transformed(self, icon, transform, ref=None):
+        """Get transformed icon from the cache, rendering it on the first use."""
+        return self.cache.get(icon, transform, ref, self.mw.devicePixelRatioF())
+
+    def prewarm(self):
+        """Render icons of the Browse sidebar ahead of the first use."""
+        for ref in SIDEBAR_ICONS:
+            if QFile.exists(ref):
+                self.transformed(QIcon(ref), 'inverted', ref)
@@ -0,0 +1,86 @@
+"""Inversion of images, run by worker threads (see ImageInverter).
+
+This module does not depend on Anki. QImage does not need a QApplication,
+nor the GUI thread.
+"""
+from hashlib import sha1
+from os import replace
+from os.path import isfile, join
+
+from PyQt5.QtGui import QImage
+
+# results of inversion
+INVERTED = 'inverted'
+# already dark, to be displayed as is
+DARK = 'dark'
+# to be left for css filter
+TRANSPARENT = 'transparent'
+INVALID = 'invalid'
+
+SAMPLE_SIZE = 32
+
+# mean lightness (0-255) under which an image counts as dark
+DARK_LIGHTNESS = 96
+
+# share of (mostly) transparent pixels over which an image counts as transparent
+TRANSPARENT_SHARE = 0.25
+
+
+def classify(image):
+    """Is the image dark or transparent? Judged from a downscaled sample."""
+    sample = image.scaled(SAMPLE_SIZE, SAMPLE_SIZE).convertToFormat(QImage.Format_ARGB32)
+
+    lightness = 0
+    transparent = 0
+    pixels = sample.width() * sample.height()
+
+    for y in range(sample.height()):
+        for x in range(sample.width()):
+            color = sample.pixelColor(x, y)
+            if color.alpha() < 128:
+                transparent += 1
+            lightness += color.lightness()
+
+    if not pixels:
+        return INVALID
+    if transparent / pixels > TRANSPARENT_SHARE:
+        return TRANSPARENT
+    if lightness / pixels < DARK_LIGHTNESS:
+        return DARK
+    return None
+
+
+def invert_file(source, directory):
+    """Write an inverted copy of the image to directory, named by hash of the source.
+
+    Returns:
+        (sha1 of the source, result), result being one of
+        INVERTED, DARK, TRANSPARENT or INVALID
+    """
+    with open(source, 'rb') as source_file:
+        data = source_file.read()
+
+    digest = sha1(data).hexdigest()
+    target = join(directory, digest + '.png')
+
+    if isfile(target):
+        return digest, INVERTED
+
+    image = QImage()
+    if not image.loadFromData(data):
+        return digest, INVALID
+
+    result = classify(image)
+    if result:
+        return digest, result
+
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    image.invertPixels(QImage.InvertRgb)
+
+    # write under a temporary name first, so that a partially written file is never served
+    temporary = target + '.part'
+    if not image.save(temporary, 'PNG'):
+        return digest, INVALID
+    replace(temporary, target)
+
+    return digest, INVERTED
@@ -0,0 +1,170 @@
+"""Inverted copies of media images, generated in the background.
+
+With "Invert images" on, each image of a card is inverted by a css filter,
+which QtWebEngine has to apply whenever the card gets painted - slow for
+large images, especially with software rendering. Instead, the images can
+be inverted once, by worker threads, and the inverted copies (kept in
+user_files, named by hash of the original) get linked from the cards.
+Copies which are not linked to anymore are removed when the profile
+gets closed.
+
+Threads rather than processes: forking Anki (a multithreaded Qt
+application) can deadlock the child, and spawned processes would import
+the main module, i.e. start Anki again. PyQt releases the GIL while
+QImage decodes, inverts and encodes, which is where the time goes.
+
+Images which are already dark are displayed as they are. Images with
+transparency, and those which were not inverted yet, are still inverted
+by the css filter (see ImageStyle.invert).
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir, makedirs, remove
+from os.path import dirname, abspath, join, isfile
+from urllib.parse import unquote
+
+from . import image_inversion as worker
+
+IMAGE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+SOURCE = re.compile(r'''(\ssrc\s*=\s*)("[^"]*"|'[^']*'|[^\s"'>]+)''', re.IGNORECASE)
+MARKER = 'data-redesign-inverted'
+
+
+class ImageInverter:
+    """Inverts media images in the background, and links the inverted copies from cards."""
+
+    # served by the media server, as the stylesheets (see ExternalStylesheets)
+    directory = 'user_files/web/inverted'
+    max_workers = 2
+
+    def __init__(self, app, mw):
+        self.app = app
+        self.mw = mw
+        self.path = join(dirname(abspath(__file__)), *self.directory.split('/'))
+        self.index_path = join(self.path, 'index.json')
+        # path of a media file => [modification time, size, sha1, result]
+        self.images = None
+        self.submitted = set()
+        self.executor = None
+
+    @property
+    def available(self):
+        return self.app.stylesheets.add_on is not None
+
+    def load(self):
+        self.images = {}
+        try:
+            with open(self.index_path, encoding='utf-8') as index_file:
+                self.images = json.load(index_file)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if self.images is None:
+            return
+        makedirs(self.path, exist_ok=True)
+        # results may be added by the executor in the meantime
+        images = dict(self.images)
+        with open(self.index_path, 'w', encoding='utf-8') as index_file:
+            json.dump(images, index_file)
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        self.submitted.clear()
+        self.prune()
+        self.save()
+
+    def prune(self):
+        """Forget media files which are gone, and remove copies no longer linked to."""
+        if self.images is None:
+            return
+        # the index is shared by all profiles, so files are checked rather than collection media
+        for path in list(self.images):
+            if not isfile(path):
+                del self.images[path]
+
+        linked = {
+            entry[2] + '.png'
+            for entry in self.images.values()
+            if entry[3] == worker.INVERTED
+        }
+        try:
+            file_names = listdir(self.path)
+        except OSError:
+            return
+        for file_name in file_names:
+            if file_name.endswith('.png') and file_name not in linked:
+                try:
+                    remove(join(self.path, file_name))
+                except OSError:
+                    pass
+
+    def submit(self, path, modified, size):
+        if path in self.submitted:
+            return
+        if not self.executor:
+            makedirs(self.path, exist_ok=True)
+            self.executor = ThreadPoolExecutor(self.max_workers)
+        self.submitted.add(path)
+        future = self.executor.submit(worker.invert_file, path, self.path)
+        future.add_done_callback(lambda future: self.on_done(path, modified, size, future))
+
+    def on_done(self, path, modified, size, future):
+        # called by a thread of the executor: only plain data can be touched
+        self.submitted.discard(path)
+        try:
+            digest, result = future.result()
+        except Exception:
+            digest, result = None, worker.INVALID
+        self.images[path] = [modified, size, digest, result]
+
+    def href(self, digest):
+        file_name = digest + '.png'
+        return self.mw.serverURL() + '_addons/' + self.app.stylesheets.add_on + '/' + self.directory + '/' + file_name
+
+    def replace_image(self, match):
+        tag = match.group(0)
+        if MARKER in tag:
+            return tag
+
+        source = SOURCE.search(tag)
+        if not source:
+            return tag
+        prefix, value = source.groups()
+        quote = value[0] if value[0] in '"\'' else ''
+        name = unquote(value.strip('"\''))
+
+        # only images from the media folder
+        if not name or ':' in name or name.startswith('/'):
+            return tag
+
+        path = join(self.mw.col.media.dir(), name)
+        try:
+            status = os.stat(path)
+        except OSError:
+            return tag
+
+        entry = self.images.get(path)
+        if not entry or entry[0] != status.st_mtime or entry[1] != status.st_size:
+            self.submit(path, status.st_mtime, status.st_size)
+            return tag
+
+        digest, result = entry[2], entry[3]
+        if result == worker.INVERTED:
+            tag = tag[:source.start()] + prefix + quote + self.href(digest) + quote + tag[source.end():]
+        elif result != worker.DARK:
+            return tag
+
+        return tag[:4] + ' ' + MARKER + tag[4:]
+
+    def replace_images(self, html):
+        """Html with images replaced by their inverted copies, when available."""
+        if not self.available or '<img' not in html.lower():
+            return html
+        if self.images is None:
+            self.load()
+        return IMAGE.sub(self.replace_image, html)
@@ -1,13 +1,18 @@
+import json
 import re
+from collections import defaultdict
+from time import perf_counter
 from PyQt5 import QtCore
 from abc import abstractmethod, ABCMeta
 from inspect import isclass
 from types import MethodType
 
-from anki.hooks import wrap
 from anki.lang import _
 from aqt.utils import showWarning
 
+from .css_pipeline import optimize as optimize_css
+from .wrappers import compile_wrapper, CallStats
+
 
 try:
     from_utf8 = QtCore.QString.fromUtf8
@@ -30,9 +35,177 @@ class PropertyDescriptor:
         self.value = value
 
 
+def fingerprint(value):
+    """Comparable snapshot of a setting value.
+
+    Mutable values (dicts, sets) are serialized, so that changes made
+    in place (e.g. by ColorMapWindow) are detected as well.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True, default=sorted)
+
+
+class DependencyRecorder:
+    """Collects names and values of settings read during css generation.
+
+    Recordings can be nested: settings read by an inner css property
+    become dependencies of the outer property as well. Recordings started
+    on behalf of a reader (a Style or a Styler) are also noted down in
+    the dependency graph: setting name => objects which read it.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.readers = defaultdict(set)
+
+    def start(self, reader=None):
+        self.frames.append((reader, {}))
+
+    def stop(self):
+        reader, dependencies = self.frames.pop()
+        if reader is not None:
+            for name in dependencies:
+                self.readers[name].add(reader)
+        self.extend(dependencies)
+        return dependencies
+
+    def extend(self, dependencies):
+        if self.frames:
+            self.frames[-1][1].update(dependencies)
+
+    def record(self, name, value, reader=None):
+        if reader is not None:
+            self.readers[name].add(reader)
+        if self.frames:
+            self.frames[-1][1][name] = fingerprint(value)
+
+    def readers_of(self, names):
+        return set().union(*(self.readers[name] for name in names))
+
+
+config_reads = DependencyRecorder()
+
+
+class ChangeCounter:
+    """Counts changes of settings.
+
+    Bumped whenever a setting gets assigned and whenever a refresh is
+    requested (which covers values modified in place); as long as it
+    stays the same, cached css is known to be valid without comparing
+    the fingerprints of its dependencies.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+
+config_changes = ChangeCounter()
+
+
+class CachedCss:
+
+    def __init__(self, value, dependencies, version=None):
+        self.value = value
+        self.dependencies = dependencies
+        # config_changes.value at which the entry was last known to be valid
+        self.version = version
+
+    def is_valid(self, config):
+        return all(
+            fingerprint(getattr(config, name)) == value
+            for name, value in self.dependencies.items()
+        )
+
+
 class css(PropertyDescriptor):
+    """Generated CSS/QSS, memoized per instance.
+
+    The cached text is reused until any of the settings
+    read while generating it changes its value.
+    """
     is_css = True
 
+    # (owner class, property name) of all css properties
+    registry = []
+
+    # are evaluations timed (while diagnostics are shown)? they are always counted
+    timed = False
+
+    def __init__(self, value=None):
+        super().__init__(value)
+        self.name = value.__name__ if value else None
+        self.cache = {}
+        # entries restored from disk, by the name of the owner class
+        self.preloaded = {}
+        # CallStats of evaluations, by instance
+        self.stats = {}
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.registry.append((owner, name))
+
+    def __get__(self, obj, obj_type):
+        if obj is None:
+            return self
+
+        version = config_changes.value
+        cached = self.cache.get(obj)
+        if cached is not None and cached.version == version:
+            config_reads.extend(cached.dependencies)
+            return cached.value
+
+        cached = cached or self.preloaded.pop(type(obj).__name__, None)
+        if cached and cached.is_valid(obj.config):
+            cached.version = version
+            self.cache[obj] = cached
+            config_reads.extend(cached.dependencies)
+            return cached.value
+
+        config_reads.start(obj)
+        start = perf_counter() if self.timed else None
+        try:
+            value = self.value(obj)
+        finally:
+            dependencies = config_reads.stop()
+            stats = self.stats.setdefault(obj, CallStats())
+            stats.calls += 1
+            if start is not None:
+                stats.time += perf_counter() - start
+
+        self.cache[obj] = CachedCss(value, dependencies, version)
+        return value
+
+    def __set__(self, obj, value):
+        self.value = value
+        self.cache.clear()
+
+    @classmethod
+    def export_cache(cls):
+        """Valid cache entries of all css properties, in a serializable form."""
+        entries = {}
+        for owner, name in cls.registry:
+            descriptor = owner.__dict__[name]
+            for obj, cached in descriptor.cache.items():
+                if cached.is_valid(obj.config):
+                    key = type(obj).__name__ + '.' + name
+                    entries[key] = {
+                        'value': cached.value,
+                        'dependencies': cached.dependencies
+                    }
+        return entries
+
+    @classmethod
+    def import_cache(cls, entries):
+        for owner, name in cls.registry:
+            entry = entries.get(owner.__name__ + '.' + name)
+            if entry:
+                descriptor = owner.__dict__[name]
+                descriptor.preloaded[owner.__name__] = CachedCss(entry['value'], entry['dependencies'])
+
 
 def abstract_property(func):
     return property(abstractmethod(func))
@@ -155,6 +328,11 @@ class Setting(RequiringMixin, SnakeNameMixin, metaclass=SingletonMetaclass):
         """Default value of a setting"""
         pass
 
+    def __setattr__(self, name, value):
+        if name == 'value':
+            config_changes.bump()
+        super().__setattr__(name, value)
+
     def on_load(self):
         """Callback called after loading of initial value"""
         pass
@@ -182,7 +360,7 @@ def decorate_or_call(operator):
 
 @decorate_or_call
 def style_tag(some_css):
-    return '<style>' + some_css + '</style>'
+    return '<style>' + optimize_css(some_css) + '</style>'
 
 
 @decorate_or_call
@@ -210,14 +388,12 @@ class StylerMetaclass(AbstractRegisteringType):
         # additions and replacements
         cls.additions = {}
         cls.replacements = {}
+        cls.wrapper_stats = {}
+        # key => (original, hook, target) of wrapped methods, see compile_wrappers()
+        cls.wrapped = {}
 
         target = attributes.get('target', None)
 
-        def callback_maker(wrapper):
-            def raw_new(*args, **kwargs):
-                return wrapper(cls.instance, *args, **kwargs)
-            return raw_new
-
         for key, attr in attributes.items():
 
             if key == 'init':
@@ -232,14 +408,16 @@ class StylerMetaclass(AbstractRegisteringType):
                 if type(original) is MethodType:
                     original = original.__func__
 
-                new = wrap(original, callback_maker(attr), attr.position)
+                if attr.position == 'around':
+                    # prepare for move_args_to_kwargs() invoked on each call
+                    arguments_binding(original)
 
-                # for classes, just add the new function, it will be bound later,
-                # but instances need some more work: we need to bind!
-                if not isclass(target):
-                    new = MethodType(new, target)
+                cls.wrapper_stats[key] = CallStats()
 
-                cls.replacements[key] = new
+                # for classes, just add the new function, it will be bound later,
+                # but for instances the wrapper needs to pass the target itself
+                cls.wrapped[key] = (original, attr, None if isclass(target) else target)
+                cls.replacements[key] = cls.compile_wrapper(key)
 
             if hasattr(attr, 'appends_in_night_mode'):
                 if not target:
@@ -250,9 +428,17 @@ class StylerMetaclass(AbstractRegisteringType):
                     raise Exception(f'Asked to replace "{key}" but target of {name} not defined')
                 cls.replacements[key] = attr
 
-            # TODO: invoke and cache css?
-            if hasattr(attr, 'is_css'):
-                pass
+    def compile_wrapper(cls, key, timed=False):
+        original, hook, target = cls.wrapped[key]
+        return compile_wrapper(
+            key, original, hook, cls, hook.position, cls.wrapper_stats[key], config_reads,
+            target=target, timed=timed
+        )
+
+    def compile_wrappers(cls, timed=False):
+        """Recompile wrappers of the methods, with or without timing of calls."""
+        for key in cls.wrapped:
+            cls.replacements[key] = cls.compile_wrapper(key, timed)
 
 
 def wraps(method=None, position='after'):
@@ -282,20 +468,56 @@ class replaces_in_night_mode(PropertyDescriptor):
     replaces_in_night_mode = True
 
 
-def move_args_to_kwargs(original_function, args, kwargs):
-    args = list(args)
-
-    import inspect
-
-    signature = inspect.signature(original_function)
-    i = 0
-    for name, parameter in signature.parameters.items():
-        if i >= len(args):
-            break
-        if parameter.default is not inspect._empty:
-            value = args.pop(i)
-            kwargs[name] = value
-        else:
-            i += 1
-    return args, kwargs
+class ArgumentsBinding:
+    """Precomputed plan for moving arguments with defaults to kwargs.
+
+    Positional arguments passed in place of parameters which have default
+    values are moved to kwargs, so that wrappers can inspect and modify
+    them by name (e.g. "head" of AnkiWebView.stdHtml).
+    """
+
+    def __init__(self, function):
+        import inspect
+
+        self.required = 0
+        self.optional = []
+        self.variadic = False
+
+        for name, parameter in inspect.signature(function).parameters.items():
+            if parameter.kind == parameter.VAR_POSITIONAL:
+                self.variadic = True
+            if parameter.kind not in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+                break
+            if parameter.default is parameter.empty:
+                self.required += 1
+            else:
+                self.optional.append(name)
+
+    def apply(self, args, kwargs):
+        required = self.required
+        if len(args) <= required:
+            return list(args), kwargs
+
+        if len(args) > required + len(self.optional):
+            # surplus arguments have to stay positional, and so do these before them;
+            # without *args in the signature, the original raises TypeError for them
+            return list(args), kwargs
 
+        kwargs.update(zip(self.optional, args[required:]))
+        return list(args[:required]), kwargs
+
+
+bindings = {}
+
+
+def arguments_binding(function):
+    """Binding plan for given function, cached."""
+    try:
+        return bindings[function]
+    except KeyError:
+        binding = bindings[function] = ArgumentsBinding(function)
+        return binding
+
+
+def move_args_to_kwargs(original_function, args, kwargs):
+    return arguments_binding(original_function).apply(args, kwargs)
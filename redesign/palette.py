@@ -0,0 +1,152 @@
+"""Native theming of Qt widgets with an application-wide QPalette.
+
+Style sheets make Qt paint the affected widgets with the (slow) style
+sheet engine. Colors can be given with a palette instead, so that the
+widgets keep the fast paths of the native style; style sheets are then
+needed only for what a palette cannot express (rounded buttons, arrows).
+"""
+import re
+
+from PyQt5.QtGui import QColor, QPalette
+
+from .css_pipeline import minify, split_rules
+
+RGB_FUNCTION = re.compile(r'rgba?\((.*)\)', re.IGNORECASE)
+
+# properties of style sheets which can be expressed with a palette
+PALETTE_PROPERTIES = {
+    'color',
+    'background',
+    'background-color',
+    'alternate-background-color',
+    'selection-color',
+    'selection-background-color'
+}
+
+
+def parse_channel(value):
+    if value.endswith('%'):
+        return round(float(value[:-1]) * 255 / 100)
+    return round(float(value))
+
+
+def parse_alpha(value):
+    if value.endswith('%'):
+        return float(value[:-1]) / 100
+    return float(value)
+
+
+def parse_rgba(text):
+    """Parse css color given as rgb(), rgba() or #rrggbbaa.
+
+    Returns:
+        (red, green, blue, alpha) with alpha between 0 and 1,
+        or None if the color is given in any other way
+    """
+    text = text.strip()
+
+    match = RGB_FUNCTION.fullmatch(text)
+    if match:
+        parts = re.split(r'[\s,/]+', match.group(1).strip())
+        if len(parts) not in (3, 4):
+            return None
+        try:
+            red, green, blue = (parse_channel(part) for part in parts[:3])
+            alpha = parse_alpha(parts[3]) if len(parts) == 4 else 1.0
+        except ValueError:
+            return None
+        clamp = lambda value, maximum: min(max(value, 0), maximum)
+        return clamp(red, 255), clamp(green, 255), clamp(blue, 255), clamp(alpha, 1.0)
+
+    # css puts alpha at the end, while Qt would expect #aarrggbb
+    if re.fullmatch(r'#[0-9a-fA-F]{8}', text):
+        red, green, blue, alpha = (int(text[i:i + 2], 16) for i in range(1, 9, 2))
+        return red, green, blue, alpha / 255
+
+    return None
+
+
+def parse_color(text):
+    """QColor from css color: names, #rgb, #rrggbb, #rrggbbaa, rgb() and rgba()."""
+    rgba = parse_rgba(text)
+    if rgba:
+        red, green, blue, alpha = rgba
+        color = QColor(red, green, blue)
+        color.setAlphaF(alpha)
+        return color
+    return QColor(text.strip())
+
+
+def build_palette(background, card, text, primary):
+    """Palette for given colors of Redesign (as in css)."""
+    background = parse_color(background)
+    card = parse_color(card)
+    text = parse_color(text)
+    primary = parse_color(primary)
+
+    disabled_text = QColor(text)
+    disabled_text.setAlphaF(0.5)
+
+    palette = QPalette()
+    roles = {
+        QPalette.Window: background,
+        QPalette.WindowText: text,
+        QPalette.Base: card,
+        QPalette.AlternateBase: background,
+        QPalette.ToolTipBase: card,
+        QPalette.ToolTipText: text,
+        QPalette.Text: text,
+        QPalette.Button: card,
+        QPalette.ButtonText: text,
+        QPalette.Highlight: primary,
+        QPalette.HighlightedText: QColor('#ffffff'),
+        QPalette.Link: primary
+    }
+    for role, color in roles.items():
+        palette.setColor(role, color)
+
+    for role in [QPalette.WindowText, QPalette.Text, QPalette.ButtonText]:
+        palette.setColor(QPalette.Disabled, role, disabled_text)
+
+    return palette
+
+
+def is_palette_rule(selector, declarations):
+    """Does the rule set only colors, in a way which a palette can express?"""
+    if ':' in selector:
+        # states (hover, pressed) and sub-controls (e.g. arrows)
+        return False
+    for declaration in declarations.split(';'):
+        name, _, value = declaration.partition(':')
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PALETTE_PROPERTIES:
+            return False
+        if 'url(' in value or 'gradient' in value:
+            return False
+    return True
+
+
+def without_palette_colors(qss):
+    """Drop rules of the style sheet which only set colors."""
+    items = split_rules(minify(qss))
+    if items is None:
+        return qss
+    return ''.join(
+        body if selector is None else selector + '{' + body + '}'
+        for selector, body in items
+        if selector is None or not is_palette_rule(selector, body)
+    )
+
+
+def uses_palette(config):
+    """Is the palette installed (see PaletteStyler)? It is not applied outside of dialogs."""
+    return config.native_palette and config.enable_in_dialogs
+
+
+def palette_aware(qss, config):
+    """Style sheet to use, depending on whether the palette is installed."""
+    if uses_palette(config):
+        return without_palette_colors(qss)
+    return qss
@@ -0,0 +1,99 @@
+"""Composition of Qt style sheets of a window into a single one.
+
+Setting a style sheet on a widget makes Qt re-polish the whole subtree
+of that widget, so styling a dialog widget by widget repeats that work
+for every call. Instead, style sheets meant for particular widgets are
+scoped with the objectName of the widget and set on the window at once.
+
+Scoping keeps the meaning of the original style sheet: each selector
+is applied both to the widget itself (if it matches) and to its
+descendants. The id selector also raises specificity, which stands in
+for the precedence a widget's own style sheet has over the window's.
+"""
+import re
+from functools import lru_cache
+
+from .css_pipeline import minify, split_rules
+
+COMBINATOR = re.compile(r'[ >]')
+PSEUDO_OR_ATTRIBUTE = re.compile(r'[:\[]')
+
+
+def scope_selector(selector, scope):
+    """Restrict selector to the widget with given id and its descendants."""
+    descendant = scope + ' ' + selector
+
+    combinator = COMBINATOR.search(selector)
+    end = combinator.start() if combinator else len(selector)
+    first = selector[:end]
+
+    if re.search(re.escape(scope) + r'(?![\w-])', first):
+        return selector + ',' + descendant
+
+    pseudo = PSEUDO_OR_ATTRIBUTE.search(first)
+    position = pseudo.start() if pseudo else end
+    itself = selector[:position] + scope + selector[position:]
+
+    return itself + ',' + descendant
+
+
+def scope_qss(qss, scope):
+    items = split_rules(minify(qss))
+    if items is None:
+        # malformed style sheet, better not to touch it
+        return qss
+    rules = []
+    for selector, body in items:
+        if selector is None:
+            rules.append(body)
+        else:
+            selectors = ','.join(scope_selector(s, scope) for s in selector.split(','))
+            rules.append(selectors + '{' + body + '}')
+    return ''.join(rules)
+
+
+@lru_cache(maxsize=32)
+def compose(window_class, parts):
+    """Style sheet for a window.
+
+    Args:
+        window_class: name of the class of the window (for the cache)
+        parts: tuples of (scope, qss), scope being None for
+            the style sheets of the window itself
+    """
+    return ''.join(
+        qss if scope is None else scope_qss(qss, scope)
+        for scope, qss in parts
+    )
+
+
+class QssComposer:
+    """Collects style sheets for widgets of a window, to set them at once."""
+
+    def __init__(self, window):
+        self.window = window
+        self.parts = []
+
+    def add(self, qss, widget=None, name=None):
+        """Add a style sheet for a widget of the window.
+
+        Args:
+            qss: style sheet
+            widget: descendant of the window to which the style sheet
+                applies, if not given it applies to the window itself
+            name: objectName to give to the widget if it has none
+        """
+        if widget is None:
+            self.parts.append((None, qss))
+            return
+
+        object_name = widget.objectName()
+        if not object_name:
+            object_name = name or 'redesign_' + type(widget).__name__ + '_' + str(len(self.parts))
+            widget.setObjectName(object_name)
+
+        self.parts.append(('#' + object_name, qss))
+
+    @property
+    def style_sheet(self):
+        return compose(type(self.window).__name__, tuple(self.parts))
@@ -42,12 +42,19 @@ from aqt import mw
 from PyQt5.QtWidgets import QMessageBox
 
 from .actions_and_settings import *
-from .internals import alert
+from .bundle import StylesBundle
+from .stylesheets import ExternalStylesheets
+from .internals import alert, config_changes, config_reads
 from .config import Config, ConfigValueGetter
+from .color_inventory import ColorInventory
+from .color_remapper import ColorRemapper
 from .css_class import inject_css_class
+from .editor_background import BackgroundCleaner
 from .icons import Icons
+from .image_inverter import ImageInverter
 from .menu import get_or_create_menu, Menu
-from .stylers import Styler
+from .scheduler import RefreshScheduler
+from .stylers import Styler, ReviewerCards
 from .styles import Style, MessageBoxStyle
 
 __addon_name__ = 'Redesign'
@@ -93,12 +100,39 @@ class StylingManager:
 
     def replace(self):
         for styler in self.active_stylers:
-            styler.replace_attributes()
+            styler.activate()
+
+    def dependent_stylers(self, changed):
+        """Active stylers which read any of the changed settings."""
+        readers = config_reads.readers_of(changed)
+        return [
+            styler
+            for styler in self.active_stylers
+            if styler in readers
+        ]
+
+    def update(self, changed):
+        """Re-apply stylers affected by the change of given settings.
+
+        Returns:
+            list of the affected stylers
+        """
+        stylers = self.dependent_stylers(changed)
+        for styler in stylers:
+            # stylers awaiting lazy activation will read new values when activated
+            if styler.has_static_styles and styler.applied:
+                styler.replace_attributes()
+        return stylers
 
     def restore(self):
         for styler in self.stylers:
             styler.restore_attributes()
 
+    def hot_swap(self, stylers, state, changed=None):
+        """Update styles of displayed webviews in place."""
+        for styler in stylers:
+            styler.hot_swap(state and styler.is_active, changed)
+
 
 
 
@@ -108,6 +142,7 @@ class Redesign:
         EnableNightMode,
         EnableInDialogs,
         StyleScrollBars,
+        NativePalette,
         '-',
         #PrimaryColor,
         BackgroundColor,
@@ -124,7 +159,8 @@ class Redesign:
         #UserColorMap,
         #DisabledStylers,
         '-',
-        About
+        About,
+        Diagnostics
     ]
 
     def __init__(self):
@@ -133,6 +169,14 @@ class Redesign:
         self.config.init_settings()
         self.icons = Icons(mw)
         self.styles = StylingManager(self)
+        self.bundle = StylesBundle(self, __version__)
+        self.stylesheets = ExternalStylesheets(self, mw)
+        self.stylesheets.register()
+        self.scheduler = RefreshScheduler(self, mw)
+        self.background_cleaner = BackgroundCleaner()
+        self.color_remapper = ColorRemapper()
+        self.color_inventory = ColorInventory(self, mw)
+        self.image_inverter = ImageInverter(self, mw)
 
         view_menu = get_or_create_menu('addon_view_menu', '&View')
         self.menu = Menu(
@@ -146,6 +190,8 @@ class Redesign:
         # Disabled, uses delay in __init__.py
         # addHook('profileLoaded', self.load)
         addHook('prepareQA', self.night_class_injection)
+        addHook('prepareQA', self.remap_colors)
+        addHook('prepareQA', self.pre_inverted_images)
         addHook('loadNote', self.background_bug_workaround)
 
     def load(self):
@@ -155,10 +201,15 @@ class Redesign:
         """
         self.config.load()
         self.profile_loaded = True
+        self.bundle.load()
+        self.icons.prewarm()
 
         self.refresh()
         self.update_menu()
 
+        if self.config.index_colors.value or self.config.seed_color_map.value:
+            self.color_inventory.start()
+
         runHook("night_mode_config_loaded", self.config)
 
 
@@ -166,7 +217,12 @@ class Redesign:
         self.menu.update_checkboxes(self.config.settings)
 
     def save(self):
+        self.scheduler.cancel()
+        self.color_inventory.stop()
+        self.image_inverter.shutdown()
         self.config.save()
+        self.bundle.save()
+        self.stylesheets.prune()
 
     def on(self):
         """Turn on redesign."""
@@ -178,10 +234,19 @@ class Redesign:
         self.styles.restore()
         runHook("night_mode_state_changed", False)
 
-    def refresh(self, reload=False):
+    def refresh(self, reload=False, changed=None):
         """
         Refresh display by re-enabling redesign or normal mode,
         regenerate customizable css strings.
+
+        Args:
+            reload: restore all stylers before re-applying them
+            changed: names of settings which were modified; if given,
+                only the stylers reading these settings are re-applied
+                and only the screens styled by them are reloaded
+
+        With live restyle enabled (default), displayed screens are not
+        reloaded; instead, styles are replaced in place in their webviews.
         """
         state = self.config.state_on.value
 
@@ -189,31 +254,51 @@ class Redesign:
             alert(ERROR_NO_PROFILE)
             return
 
+        config_changes.bump()
+
         try:
-            if state:
-                if reload:
-                    self.off()
-                self.on()
+            if changed is not None and not reload:
+                stylers = self.styles.update(changed) if state else []
             else:
-                self.off()
+                if state:
+                    if reload:
+                        self.off()
+                    self.on()
+                else:
+                    self.off()
+                stylers = self.styles.stylers
         except Exception:
             alert(ERROR_SWITCH % traceback.format_exc())
             return
 
-        # Reload current screen.
-        if mw.state == 'review':
-            mw.moveToState('overview')
-            mw.moveToState('review')
-        if mw.state == 'deckBrowser':
-            mw.deckBrowser.refresh()
-        if mw.state == 'overview':
-            mw.overview.refresh()
+        if self.config.live_restyle.value and not reload:
+            self.styles.hot_swap(stylers, state, changed)
+        else:
+            self.reload_screens(stylers)
 
-        # Redraw toolbar (should be always visible).
-        mw.toolbar.draw()
         self.update_menu()
         return True
 
+    def reload_screens(self, stylers):
+        """Reload current screen and toolbar if styled by any of the stylers."""
+        screens = set()
+        for styler in stylers:
+            screens.update(styler.screens)
+
+        # Reload current screen.
+        if mw.state in screens:
+            if mw.state == 'review':
+                mw.moveToState('overview')
+                mw.moveToState('review')
+            if mw.state == 'deckBrowser':
+                mw.deckBrowser.refresh()
+            if mw.state == 'overview':
+                mw.overview.refresh()
+
+        # Redraw toolbar (should be always visible).
+        if 'toolbar' in screens:
+            mw.toolbar.draw()
+
     def about(self):
         about_box = self.message_box()
         about_box.setText(__addon_name__ + ' ' + __version__ + __doc__)
@@ -230,95 +315,27 @@ class Redesign:
         return box
 
     def night_class_injection(self, html, card, context):
+        # the reviewer page keeps the class by itself, but only if
+        # ReviewerCards is applied (it can be disabled in the stylers selector)
+        reviewer_cards = ReviewerCards.instance
+        if context.startswith('review') and reviewer_cards and reviewer_cards.applied:
+            return html
         html = inject_css_class(self.config.state_on.value, html)
         return html
 
-    def background_bug_workaround(self, editor):
+    def remap_colors(self, html, card, context):
+        if not self.config.state_on.value:
+            return html
+        return self.color_remapper.remap_card(html, card, context)
 
-        if self.config.state_on.value:
-            javascript = """
-            (function bg_bug_workaround()
-            {
-                function getTextNodeAtPosition(root, index){
-                    // Copyright notice:
-                    //
-                    //  following function is based on a function created by Pery Mimon:
-                    //      https://stackoverflow.com/a/38479462
-                    //  and is distributed under CC-BY SA 3.0 license terms:
-                    //      https://creativecommons.org/licenses/by-sa/3.0/
-
-                    var lastNode = null;
-                    var lastIndex = null
-
-                    var treeWalker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT,function next(elem) {
-                        if(index >= elem.textContent.length){
-                            lastIndex = index
-                            index -= elem.textContent.length;
-                            lastNode = elem;
-                            return NodeFilter.FILTER_REJECT
-                        }
-                        return NodeFilter.FILTER_ACCEPT;
-                    });
-                    var c = treeWalker.nextNode();
-                    return {
-                        node: c ? c : lastNode,
-                        position: c ? index : lastIndex
-                    };
-                }
-
-                var regex = /<(span|strong) style="background-color: rgb\(255, 255, 255\);">(.*?)<\/(span|strong)>/gm
-
-                function background_workaround_callback(raw_field)
-                {
-                    function get_rid_of_background(){
-                        var field = $(raw_field)
-                        var html = field.html()
-
-                        if(html.search(regex) == -1)
-                            return
-
-                        var selection = window.getSelection()
-                        var range = selection.getRangeAt(0)
-                        range.setStart(raw_field, 0)
-                        var len = range.toString().length
-
-                        field.html(html.replace(regex, '<$1>$2</$1>'))
-
-                        var range = new Range()
-                        var pos = getTextNodeAtPosition(raw_field, len)
-
-                        range.setStart(pos.node, pos.position)
-
-                        selection.removeAllRanges()
-                        selection.addRange(range)
-                    }
-                    return get_rid_of_background
-                }
-
-                var field = $('.field')
-
-                field.on('keydown', function(e){
-                    var raw_field = this
-                    var get_rid_of_background = background_workaround_callback(raw_field)
-
-                    if(e.which === 8 || e.which == 46){
-                        window.setTimeout(get_rid_of_background, 0)
-                    }
-                })
-
-                field.on('paste', function(){
-                    var raw_field = this
-                    var get_rid_of_background = background_workaround_callback(raw_field)
-
-                    window.setTimeout(get_rid_of_background, 100)
-                })
-
-            })()
-            """
-        else:
-            javascript = ''
+    def pre_inverted_images(self, html, card, context):
+        config = self.config
+        if not (config.state_on.value and config.invert_image.value and config.pre_invert_images.value):
+            return html
+        return self.image_inverter.replace_images(html)
 
-        editor.web.eval(javascript)
+    def background_bug_workaround(self, editor):
+        self.background_cleaner.update(editor.web, self.config.state_on.value)
 
 
 ERROR_NO_PROFILE = """Switching to redesign failed: The profile is not loaded yet.
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QTimer
+
+from .internals import config_changes
+
+
+class RefreshScheduler:
+    """Coalesces bursts of refresh requests into a single restyle.
+
+    Settings can change many times in a row: each tick of a time editor,
+    each checkbox toggled by "Check/uncheck all", each color of a preset.
+    Rather than refreshing right away, changes are marked as pending and
+    applied once the requests stop coming for a moment (see delay).
+
+    Changes made within batch() are applied together, as soon as
+    the (outermost) batch ends:
+
+        with app.scheduler.batch():
+            config.color_b = ...
+            config.color_t = ...
+            app.scheduler.request(changed={'color_b', 'color_t'})
+    """
+
+    # milliseconds to wait for further requests
+    delay = 50
+
+    def __init__(self, app, parent=None):
+        self.app = app
+        self.timer = QTimer(parent)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.depth = 0
+        self.clear()
+        # diagnostics
+        self.requested = 0
+        self.performed = 0
+
+    def clear(self):
+        self.pending = False
+        self.reload = False
+        # names of changed settings; None if the change is not known
+        self.changed = set()
+
+    def request(self, reload=False, changed=None):
+        """Mark styles as outdated, see Redesign.refresh() for arguments."""
+        self.requested += 1
+        # settings could have been modified in place
+        config_changes.bump()
+        self.reload = self.reload or reload
+        if changed is None or self.changed is None:
+            self.changed = None
+        else:
+            self.changed |= set(changed)
+        self.pending = True
+
+        if not self.depth:
+            # restarting the timer postpones the refresh until the burst ends
+            self.timer.start(self.delay)
+
+    @contextmanager
+    def batch(self):
+        """Apply requests made within the block at once, when it ends."""
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.flush()
+
+    def flush(self):
+        """Perform the pending refresh now."""
+        self.timer.stop()
+        if not self.pending:
+            return
+        reload, changed = self.reload, self.changed
+        self.clear()
+        self.performed += 1
+        self.app.refresh(reload=reload, changed=changed)
+
+    def cancel(self):
+        self.timer.stop()
+        self.clear()
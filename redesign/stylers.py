@@ -1,9 +1,12 @@
+from inspect import isclass
+from time import perf_counter
+
 from PyQt5.QtCore import Qt
 from PyQt5 import QtWidgets
 
 import aqt
 from anki.stats import CollectionStats
-from aqt import mw, editor, QPixmap
+from aqt import mw, editor
 from aqt.addcards import AddCards
 from aqt.browser import Browser
 from aqt.clayout import CardLayout
@@ -14,12 +17,16 @@ from aqt.stats import DeckStats
 from .gui import AddonDialog, iterate_widgets
 
 from .config import ConfigValueGetter
-from .css_class import inject_css_class
-from .internals import percent_escaped, move_args_to_kwargs, from_utf8, PropertyDescriptor
+from .palette import build_palette, palette_aware, uses_palette
+from .qss import QssComposer
+from .css_class import inject_css_class, keep_css_class, replace_style_element, replace_tokens, toggle_css_class
+from .css_pipeline import optimize as optimize_css, page_rules_of_html
+from .internals import percent_escaped, move_args_to_kwargs, from_utf8, PropertyDescriptor, config_reads
 from .internals import style_tag, wraps, appends_in_night_mode, replaces_in_night_mode, css
-from .styles import SharedStyles, ButtonsStyle, ImageStyle, DeckStyle, LatexStyle, DialogStyle
+from .styles import SharedStyles, ButtonsStyle, ImageStyle, DeckStyle, LatexStyle, DialogStyle, ColorTokens
 from .internals import SnakeNameMixin, StylerMetaclass, abstract_property
 from .internals import RequiringMixin
+from .wrappers import CallStats
 
 
 
@@ -33,11 +40,28 @@ customFont = "default"; # Set your desired font here.
 
 class Styler(RequiringMixin, SnakeNameMixin, metaclass=StylerMetaclass):
 
+    # screens which display styles of this styler and have to be reloaded
+    # when those change: states of the main window ('deckBrowser',
+    # 'overview', 'review') or 'toolbar' for the top bar
+    screens = set()
+
+    # does the styler add "anki_redesign" class to body of styled pages?
+    body_class = False
+
+    # colors for css of webviews, see ColorTokens
+    var = ColorTokens()
+
     def __init__(self, app):
         RequiringMixin.__init__(self, app)
         self.app = app
-        self.config = ConfigValueGetter(app.config)
+        self.config = ConfigValueGetter(app.config, reader=self)
         self.original_attributes = {}
+        self.applied = False
+        # diagnostics
+        self.replace_stats = CallStats()
+        self.restore_stats = CallStats()
+        self.injected_bytes = 0
+        self.errors = []
 
     @abstract_property
     def target(self):
@@ -47,6 +71,105 @@ class Styler(RequiringMixin, SnakeNameMixin, metaclass=StylerMetaclass):
     def is_active(self):
         return self.name not in self.config.disabled_stylers
 
+    @property
+    def style_id(self):
+        """Identifier of the <style> element injected into webviews."""
+        return 'redesign-' + self.name.replace('_', '-')
+
+    @property
+    def tokens_element(self):
+        """<style> element defining the color tokens used by the css."""
+        return '<style class="redesign-tokens">' + self.shared.tokens + '</style>'
+
+    def style_element(self, some_css, present=frozenset()):
+        """Optimized css in a <style> element, or a <link> to a stylesheet file.
+
+        The element is preceded by the definitions of the color tokens,
+        so that the css itself does not change with the colors.
+
+        Args:
+            some_css: css to inject
+            present: rules which are already on the page, see page_rules()
+        """
+        some_css = optimize_css(some_css, present)
+        href = self.app.stylesheets.href(self.style_id, some_css)
+        if href:
+            element = '<link rel="stylesheet" id="' + self.style_id + '" href="' + href + '">'
+        else:
+            element = '<style id="' + self.style_id + '">' + some_css + '</style>'
+        element = self.tokens_element + element
+        self.injected_bytes += len(element.encode())
+        return element
+
+    def set_style_sheet(self, widget, qss):
+        self.injected_bytes += len(qss.encode())
+        widget.setStyleSheet(qss)
+
+    @property
+    def web(self):
+        """Webview showing the styles of this styler, if any."""
+        return None
+
+    @property
+    def live_css(self):
+        """The css which this styler injects into its webview."""
+        return None
+
+    @property
+    def live_web(self):
+        """The webview, if it is displayed right now."""
+        if 'toolbar' in self.screens or mw.state in self.screens:
+            return self.web
+
+    def hot_swap(self, state, changed=None):
+        """Replace styles of the displayed webview in place, without reloading it.
+
+        Args:
+            state: is Redesign enabled
+            changed: names of settings which were modified, if known;
+                when these are only colors, just the tokens get replaced
+        """
+        web = self.live_web
+        if not web:
+            return
+        if state and changed and not self.live_css_reads(changed):
+            web.eval(replace_tokens(self.shared.tokens))
+            return
+        css = optimize_css(self.live_css) if state else None
+        href = self.app.stylesheets.href(self.style_id, css) if state else None
+        script = replace_style_element(self.style_id, css, href)
+        if state:
+            script += replace_tokens(self.shared.tokens)
+        if self.body_class:
+            script += self.body_class_script(state)
+        web.eval(script)
+
+    def body_class_script(self, state):
+        """JavaScript adding or removing "anki_redesign" class on the displayed page."""
+        return toggle_css_class(state)
+
+    def live_css_reads(self, names):
+        """Does the css injected into the webview depend on any of given settings?"""
+        config_reads.start()
+        try:
+            self.live_css
+        finally:
+            dependencies = config_reads.stop()
+        return not dependencies.keys().isdisjoint(names)
+
+    @property
+    def has_static_styles(self):
+        """Are styles computed once, when replacing attributes?
+
+        Wrapped methods read the configuration on each call, so stylers
+        consisting only of wrappers do not need to be re-applied when
+        settings change.
+        """
+        return bool(self.additions) or any(
+            isinstance(replacement, PropertyDescriptor)
+            for replacement in self.replacements.values()
+        )
+
     @property
     def friendly_name(self):
         name = self.name.replace('_styler', '')
@@ -61,11 +184,39 @@ class Styler(RequiringMixin, SnakeNameMixin, metaclass=StylerMetaclass):
 
         return original
 
+    def activate(self):
+        """Replace attributes of the target.
+
+        If the target is a class (e.g. a dialog) and lazy activation is
+        enabled, the attributes will be replaced when the first instance
+        of the target gets created instead.
+        """
+        if isclass(self.target) and self.config.lazy_stylers:
+            self.replace_on_first_use()
+        else:
+            self.replace_attributes()
+
+    def replace_on_first_use(self):
+        target = self.target
+        original_init = self.get_or_create_original('__init__')
+        styler = self
+
+        def first_use(instance, *args, **kwargs):
+            target.__init__ = original_init
+            styler.replace_attributes()
+            return target.__init__(instance, *args, **kwargs)
+
+        target.__init__ = first_use
+
     def replace_attributes(self):
+        config_reads.start(self)
+        start = perf_counter()
         try:
             for key, addition in self.additions.items():
                 original = self.get_or_create_original(key)
-                setattr(self.target, key, original + addition.value(self))
+                value = addition.value(self)
+                self.injected_bytes += len(value.encode())
+                setattr(self.target, key, original + value)
 
             for key, replacement in self.replacements.items():
                 self.get_or_create_original(key)
@@ -75,13 +226,30 @@ class Styler(RequiringMixin, SnakeNameMixin, metaclass=StylerMetaclass):
 
                 setattr(self.target, key, replacement)
 
-        except (AttributeError, TypeError):
+            self.applied = True
+
+        except (AttributeError, TypeError) as error:
             print('Failed to inject style to:', self.target, key, self.name)
+            self.errors.append(key + ': ' + repr(error))
             raise
+        finally:
+            self.replace_stats.add(perf_counter() - start)
+            config_reads.stop()
+
+    def time_wrappers(self, timed):
+        """Count and time calls of the wrapped methods (or stop doing so)."""
+        cls = type(self)
+        cls.compile_wrappers(timed)
+        if self.applied:
+            for key in cls.wrapped:
+                setattr(self.target, key, self.replacements[key])
 
     def restore_attributes(self):
+        start = perf_counter()
         for key, original in self.original_attributes.items():
             setattr(self.target, key, original)
+        self.applied = False
+        self.restore_stats.add(perf_counter() - start)
 
 
 
@@ -89,16 +257,24 @@ class Styler(RequiringMixin, SnakeNameMixin, metaclass=StylerMetaclass):
 class ToolbarStyler(Styler):
 
     target = mw.toolbar
+    screens = {'toolbar'}
     require = {
         SharedStyles
     }
 
     @appends_in_night_mode
-    @style_tag
     @percent_escaped
     def _body(self):
+        return self.style_element(self.live_css)
+
+    @property
+    def live_css(self):
         return self.shared.top
 
+    @property
+    def web(self):
+        return mw.toolbar.web
+
 
 
 
@@ -129,9 +305,41 @@ class MenuStyler(Styler):
 
 
 
+class PaletteSetter:
+    """Gives access to the application-wide palette as to an attribute."""
+
+    @property
+    def palette(self):
+        return QtWidgets.QApplication.palette()
+
+    @palette.setter
+    def palette(self, value):
+        QtWidgets.QApplication.setPalette(value)
+
+
+class PaletteStyler(Styler):
+    """Colors of Qt widgets given with a palette (see palette.py)"""
+
+    target = PaletteSetter()
+
+    @replaces_in_night_mode
+    def palette(self):
+        if uses_palette(self.config):
+            return build_palette(
+                self.config.color_b,
+                self.config.color_c,
+                self.config.color_t,
+                self.config.color_p
+            )
+        return self.original_attributes['palette']
+
+
+
+
 class ReviewerStyler(Styler):
 
     target = mw.reviewer
+    screens = {'review'}
     require = {
         SharedStyles,
         ButtonsStyle
@@ -139,18 +347,25 @@ class ReviewerStyler(Styler):
 
     @wraps(position='around')
     def _bottomHTML(self, reviewer, _old):
-        return _old(reviewer) + style_tag(percent_escaped(self.bottom_css))
-
+        return _old(reviewer) + percent_escaped(self.style_element(self.bottom_css))
 
+    @property
+    def live_css(self):
+        return self.bottom_css
 
     @property
+    def web(self):
+        return mw.reviewer.bottom.web
+
+
+    @css
     def bottom_css(self):
         return self.buttons.html + self.shared.colors_replacer + """
 
         /* Note: This is the reviewer screen, bottom bar, background color */
         body, #outer{
-        background-color:""" + self.config.color_b + """;
-        border-top-color:""" + self.config.color_b + """;
+        background-color:""" + self.var.color_b + """;
+        border-top-color:""" + self.var.color_b + """;
         margin: 0 95px 0 95px;
         }
 
@@ -173,6 +388,8 @@ class ReviewerStyler(Styler):
 class ReviewerCards(Styler):
 
     target = mw.reviewer
+    screens = {'review'}
+    body_class = True
     require = {
         LatexStyle,
         ImageStyle
@@ -181,7 +398,23 @@ class ReviewerCards(Styler):
     # TODO: it can be implemented with a nice decorator
     @wraps(position='around')
     def revHtml(self, reviewer, _old):
-        return _old(reviewer) + style_tag(percent_escaped(self.body))
+        return (
+            _old(reviewer) +
+            percent_escaped(self.style_element(self.body)) +
+            '<script>' + self.body_class_script(True) + '</script>'
+        )
+
+    def body_class_script(self, state):
+        # the class is kept across cards, see Redesign.night_class_injection()
+        return keep_css_class(state)
+
+    @property
+    def live_css(self):
+        return self.body
+
+    @property
+    def web(self):
+        return mw.web
 
     @css
     def body(self):
@@ -192,10 +425,10 @@ class ReviewerCards(Styler):
         {
             background-color:black!important;
             border-color:#444!important;
-            color:"""+ self.config.color_c +"""!important
+            color:"""+ self.var.color_c +"""!important
         }
         .card input::selection{
-            color: """ + self.config.color_t + """;
+            color: """ + self.var.color_t + """;
             background: #0864d4
         }
         .typeGood{
@@ -223,7 +456,7 @@ class ReviewerCards(Styler):
         # This is the answer text color for cloze cards.
         # Good red color: #ef5350
         .cloze{
-            color:"""+ self.config.color_p +"""!important
+            color:"""+ self.var.color_p +"""!important
         }
 
         a{
@@ -233,11 +466,12 @@ class ReviewerCards(Styler):
 
         card_color = """
         .card{
-            color:""" + self.config.color_t + """!important;
+            color:""" + self.var.color_t + """!important;
         }
         """
 
-        css = css_body + card_color + self.shared.user_color_map + self.shared.body_colors
+        # colors of user_color_map are swapped in the html of cards (see ColorRemapper)
+        css = css_body + card_color + self.shared.body_colors
 
         if self.config.invert_image:
             css += self.image.invert
@@ -252,6 +486,8 @@ class ReviewerCards(Styler):
 class DeckBrowserStyler(Styler):
 
     target = mw.deckBrowser
+    screens = {'deckBrowser'}
+    body_class = True
     require = {
         SharedStyles,
         DeckStyle
@@ -259,30 +495,50 @@ class DeckBrowserStyler(Styler):
 
     @appends_in_night_mode
     def _body(self):
-        styles_html = style_tag(percent_escaped(self.deck.style + self.shared.body_colors))
+        styles_html = percent_escaped(self.style_element(self.live_css))
         return inject_css_class(True, styles_html)
 
+    @property
+    def live_css(self):
+        return self.deck.style + self.shared.body_colors
+
+    @property
+    def web(self):
+        return mw.web
+
 
 
 
 class DeckBrowserBottomStyler(Styler):
 
     target = mw.deckBrowser.bottom
+    screens = {'deckBrowser'}
+    body_class = True
     require = {
         DeckStyle
     }
 
     @appends_in_night_mode
     def _centerBody(self):
-        styles_html = style_tag(percent_escaped(self.deck.bottom))
+        styles_html = percent_escaped(self.style_element(self.live_css))
         return inject_css_class(True, styles_html)
 
+    @property
+    def live_css(self):
+        return self.deck.bottom
+
+    @property
+    def web(self):
+        return mw.deckBrowser.bottom.web
+
 
 
 
 class OverviewStyler(Styler):
 
     target = mw.overview
+    screens = {'overview'}
+    body_class = True
     require = {
         SharedStyles,
         ButtonsStyle
@@ -290,9 +546,17 @@ class OverviewStyler(Styler):
 
     @appends_in_night_mode
     def _body(self):
-        styles_html = style_tag(percent_escaped(self.css))
+        styles_html = percent_escaped(self.style_element(self.css))
         return inject_css_class(True, styles_html)
 
+    @property
+    def live_css(self):
+        return self.css
+
+    @property
+    def web(self):
+        return mw.web
+
     @css
     def css(self):
         return f"""
@@ -301,7 +565,7 @@ class OverviewStyler(Styler):
         {self.shared.body_colors}
         .descfont
         {{
-            color: {self.config.color_t}
+            color: {self.var.color_t}
         }}
         """
 
@@ -311,22 +575,31 @@ class OverviewStyler(Styler):
 class OverviewBottomStyler(Styler):
 
     target = mw.overview.bottom
+    screens = {'overview'}
     require = {
         DeckStyle
     }
 
     @appends_in_night_mode
-    @style_tag
     @percent_escaped
     def _centerBody(self):
+        return self.style_element(self.live_css)
+
+    @property
+    def live_css(self):
         return self.deck.bottom
 
+    @property
+    def web(self):
+        return mw.overview.bottom.web
+
 
 
 
 class AnkiWebViewStyler(Styler):
 
     target = mw.web
+    screens = {'deckBrowser', 'overview', 'review'}
     require = {
         SharedStyles,
         ButtonsStyle
@@ -338,10 +611,22 @@ class AnkiWebViewStyler(Styler):
 
         args, kwargs = move_args_to_kwargs(old, [web] + list(args), kwargs)
 
-        kwargs['head'] = kwargs.get('head', '') + style_tag(self.waiting_screen)
+        # skip rules which the page already has (in the body, after the head)
+        body = args[1] if len(args) > 1 else kwargs.get('body', '')
+        present = page_rules_of_html(body)
+
+        kwargs['head'] = kwargs.get('head', '') + self.style_element(self.waiting_screen, present)
 
         return old(web, *args[1:], **kwargs)
 
+    @property
+    def live_css(self):
+        return self.waiting_screen
+
+    @property
+    def web(self):
+        return mw.web
+
     @css
     def waiting_screen(self):
         return self.buttons.html + self.shared.body_colors
@@ -364,16 +649,20 @@ class BrowserStyler(Styler):
 
             basic_css = browser.styleSheet()
             global_style = '#' + browser.form.centralwidget.objectName() + '{' + self.shared.colors + '}'
-            browser.setStyleSheet(self.shared.menu + self.style + basic_css + global_style)
 
-            browser.form.tableView.setStyleSheet(self.table)
-            browser.form.tableView.horizontalHeader().setStyleSheet(self.table_header)
+            qss = QssComposer(browser)
+            qss.add(self.shared.menu + self.style + basic_css + global_style)
 
-            browser.form.searchEdit.setStyleSheet(self.search_box)
+            qss.add(self.table, browser.form.tableView)
+            qss.add(self.table_header, browser.form.tableView.horizontalHeader(), name='tableViewHeader')
+
+            qss.add(self.search_box, browser.form.searchEdit)
             browser.form.searchEdit.setSizeAdjustPolicy(QtWidgets.QComboBox.SizeAdjustPolicy.AdjustToMinimumContentsLength)
 
-            browser.form.searchButton.setStyleSheet(self.buttons.qt)
-            browser.form.previewButton.setStyleSheet(self.buttons.qt)
+            qss.add(self.buttons.qt, browser.form.searchButton)
+            qss.add(self.buttons.qt, browser.form.previewButton)
+
+            self.set_style_sheet(browser, qss.style_sheet)
 
     # TODO: test this
     #@wraps
@@ -391,15 +680,12 @@ class BrowserStyler(Styler):
         root = browser.sidebarTree
         for item in root.findItems('', Qt.MatchContains | Qt.MatchRecursive):
             icon = item.icon(0)
-            pixmap = icon.pixmap(32, 32)
-            image = pixmap.toImage()
-            # image.invertPixels()
-            new_icon = aqt.QIcon(QPixmap.fromImage(image))
+            new_icon = self.app.icons.transformed(icon, 'plain')
             item.setIcon(0, new_icon)
 
     @wraps
     def setupSidebar(self, browser):
-        browser.sidebarTree.setStyleSheet(self.style)
+        self.set_style_sheet(browser.sidebarTree, self.style)
 
 
     @wraps(position='around')
@@ -582,11 +868,7 @@ try:
         def iconFromRef(self, sidebar_model, iconRef, _old):
             icon = _old(sidebar_model, iconRef)
             if icon:
-                pixmap = icon.pixmap(32, 32)
-                image = pixmap.toImage()
-                image.invertPixels()
-                new_icon = aqt.QIcon(QPixmap.fromImage(image))
-                return new_icon
+                return self.app.icons.transformed(icon, 'inverted', iconRef)
             return icon
 except ImportError:
     pass
@@ -606,20 +888,23 @@ class AddCardsStyler(Styler):
     def init(self, add_cards, mw):
         if self.config.enable_in_dialogs:
 
+            # keep styles set by the editor
+            qss = QssComposer(add_cards)
+            qss.add(add_cards.styleSheet())
+
             # style add/history button
-            add_cards.form.buttonBox.setStyleSheet(self.buttons.qt)
+            qss.add(self.buttons.qt, add_cards.form.buttonBox)
 
-            self.set_style_to_objects_inside(add_cards.form.horizontalLayout, self.buttons.qt)
+            for widget in iterate_widgets(add_cards.form.horizontalLayout):
+                if widget:
+                    qss.add(self.buttons.qt, widget)
 
             # style the single line which has some bright color
-            add_cards.form.line.setStyleSheet('#' + from_utf8('line') + '{border: 0px solid #333}')
+            qss.add('#' + from_utf8('line') + '{border: 0px solid #333}', add_cards.form.line)
 
-            add_cards.form.fieldsArea.setAutoFillBackground(False)
+            self.set_style_sheet(add_cards, qss.style_sheet)
 
-    @staticmethod
-    def set_style_to_objects_inside(layout, style):
-        for widget in iterate_widgets(layout):
-            widget.setStyleSheet(style)
+            add_cards.form.fieldsArea.setAutoFillBackground(False)
 
 
 class EditCurrentStyler(Styler):
@@ -633,7 +918,7 @@ class EditCurrentStyler(Styler):
     def init(self, edit_current, mw):
         if self.config.enable_in_dialogs:
             # style close button
-            edit_current.form.buttonBox.setStyleSheet(self.buttons.qt)
+            self.set_style_sheet(edit_current.form.buttonBox, self.buttons.qt)
 
 
 class ProgressStyler(Styler):
@@ -647,7 +932,7 @@ class ProgressStyler(Styler):
 
     def init(self, progress, *args, **kwargs):
         if self.config.enable_in_dialogs:
-            progress.setStyleSheet(self.buttons.qt + self.dialog.style)
+            self.set_style_sheet(progress, self.buttons.qt + self.dialog.style)
 
 
 if hasattr(ProgressManager, 'ProgressNoCancel'):
@@ -667,9 +952,9 @@ if hasattr(ProgressManager, 'ProgressNoCancel'):
                 label = aqt.QLabel(label)
                 progress.setLabel(label)
                 label.setAlignment(Qt.AlignCenter)
-                label.setStyleSheet(self.dialog.style)
+                self.set_style_sheet(label, self.dialog.style)
 
-                progress.setStyleSheet(self.buttons.qt + self.dialog.style)
+                self.set_style_sheet(progress, self.buttons.qt + self.dialog.style)
 
     class ProgressNoCancel(Styler):
 
@@ -721,7 +1006,7 @@ class StatsWindowStyler(Styler):
     @wraps
     def init(self, stats, *args, **kwargs):
         if self.config.enable_in_dialogs:
-            stats.setStyleSheet(self.buttons.qt + self.dialog.style)
+            self.set_style_sheet(stats, self.buttons.qt + self.dialog.style)
 
 
 class StatsReportStyler(Styler):
@@ -738,7 +1023,7 @@ class StatsReportStyler(Styler):
     @percent_escaped
     def css(self):
         return (
-            self.shared.user_color_map + self.shared.body_colors + """
+            self.shared.tokens + self.shared.user_color_map + self.shared.body_colors + """
             body{background-image: none}
             """
         )
@@ -769,15 +1054,18 @@ class EditorStyler(Styler):
 
             editor_css += '#' + widget.objectName() + '{' + self.shared.colors + '}'
 
-            editor.parentWindow.setStyleSheet(editor_css)
-
-            editor.tags.completer.popup().setStyleSheet(self.completer)
-
-            widget.setStyleSheet(
+            qss = QssComposer(editor.parentWindow)
+            qss.add(editor_css)
+            qss.add(
                 self.qt_mid_buttons +
                 self.buttons.advanced_qt(restrict_to='#' + self.encode_class_name('fields')) +
-                self.buttons.advanced_qt(restrict_to='#' + self.encode_class_name('layout'))
+                self.buttons.advanced_qt(restrict_to='#' + self.encode_class_name('layout')),
+                widget
             )
+            self.set_style_sheet(editor.parentWindow, qss.style_sheet)
+
+            # the popup is a separate window
+            self.set_style_sheet(editor.tags.completer.popup(), self.completer)
 
     @staticmethod
     def encode_class_name(string):
@@ -817,7 +1105,7 @@ class CardLayoutStyler(Styler):
     @wraps
     def init(self, card_layout, *args, **kwargs):
         if self.config.enable_in_dialogs:
-            card_layout.mainArea.setStyleSheet(self.qt_style)
+            self.set_style_sheet(card_layout.mainArea, self.qt_style)
 
 
 
@@ -827,7 +1115,7 @@ class CardLayoutStyler(Styler):
     # Card code editor squares (left side of dialog) = QTextEdit; Seen when you go to Browse, then click Cards button to edit a card, and then on the left side
     @css
     def qt_style(self):
-        return f"""
+        return palette_aware(f"""
         QGroupBox::title
         {{
             {self.shared.colors};
@@ -839,7 +1127,7 @@ class CardLayoutStyler(Styler):
             border-radius:10px;
             border:1px solid #bdbdbd;
         }}
-        """
+        """, self.config)
 
 
 
@@ -854,9 +1142,8 @@ class EditorWebViewStyler(Styler):
     }
 
     # TODO: currently restart is required for this to take effect after configuration change
-    # @style_tag affects the bottom half of the Browse dialog
+    # the style element affects the bottom half of the Browse dialog
     @appends_in_night_mode
-    @style_tag
     @percent_escaped
     def _html(self):
         if self.config.enable_in_dialogs:
@@ -879,21 +1166,21 @@ class EditorWebViewStyler(Styler):
             }}
 
             a{{
-                background-color:{self.config.color_c};
+                background-color:{self.var.color_c};
             }}
 
             html, .fname, #topbutsOuter{{
-                color: {self.config.color_t}!important;
-                background: {self.config.color_b}!important;
+                color: {self.var.color_t}!important;
+                background: {self.var.color_b}!important;
                 outline:none;
             }}
 
             #topbuts {{
-                background: {self.config.color_b};
+                background: {self.var.color_b};
             }}
 
             body {{
-                background:{self.config.color_b};
+                background:{self.var.color_b};
                 padding:10px 0 20px 0;
             }}
 
@@ -902,7 +1189,7 @@ class EditorWebViewStyler(Styler):
                 border-radius:8px;
                 height:auto;
                 padding:4px;
-                color:"""+ self.config.color_t +""";
+                color:"""+ self.var.color_t +""";
                 font-family:"""+ customFont +""";
             }}
             """
@@ -912,7 +1199,7 @@ class EditorWebViewStyler(Styler):
             if self.config.invert_latex:
                 custom_css += ".field " + self.latex.invert
 
-            return custom_css
+            return self.style_element(custom_css)
         return ''
 
 
@@ -930,7 +1217,8 @@ class AddonDialogStyler(Styler):
             self.style(window)
 
     def style(self, window):
-        window.setStyleSheet(
+        self.set_style_sheet(
+            window,
             self.buttons.qt +
             'QDialog, QCheckBox, QLabel, QTimeEdit{' + self.shared.colors + '}'
         )
@@ -1,5 +1,6 @@
 from .config import ConfigValueGetter
 from .internals import css, snake_case, SingletonMetaclass, RequiringMixin
+from .palette import palette_aware
 
 
 
@@ -9,10 +10,38 @@ customFont = "default"; # Set your desired font here.
 # Note: If you want to change this, you need to do so in three files: _init_.py, styles.py, and stylers.py
 
 
+# css custom properties standing for the colors in styles of webviews,
+# by the name of the setting which gives their value
+COLOR_TOKENS = {
+    'color_b': '--rd-bg',
+    'color_c': '--rd-card',
+    'color_t': '--rd-text',
+    'color_p': '--rd-primary'
+}
+
+
+class ColorTokens:
+    """References to the colors, for css of webviews: var.color_b => var(--rd-bg)
+
+    Css written with tokens does not depend on the colors, so it is generated
+    once and can stay cached; only the tiny :root rule defining the tokens
+    (SharedStyles.tokens) has to change with the colors. Qt style sheets do
+    not support custom properties, so these keep using the config directly.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return 'var(' + COLOR_TOKENS[name] + ')'
+        except KeyError:
+            raise AttributeError(name)
+
+
 
 
 class Style(RequiringMixin, metaclass=SingletonMetaclass):
 
+    var = ColorTokens()
+
     @property
     def name(self):
         return snake_case(self.__class__.__name__).split('_')[0]
@@ -20,7 +49,7 @@ class Style(RequiringMixin, metaclass=SingletonMetaclass):
     def __init__(self, app):
         RequiringMixin.__init__(self, app)
         self.app = app
-        self.config = ConfigValueGetter(app.config)
+        self.config = ConfigValueGetter(app.config, reader=self)
 
 
 class SharedStyles(Style):
@@ -36,6 +65,14 @@ class SharedStyles(Style):
         # TODO
         pass
 
+    @css
+    def tokens(self):
+        """Definitions of the color tokens, for webviews."""
+        return ':root{' + ''.join(
+            token + ':' + getattr(self.config, name) + ';'
+            for name, token in COLOR_TOKENS.items()
+        ) + '}'
+
     @css
     def top(self):
 
@@ -44,14 +81,14 @@ class SharedStyles(Style):
 
         /* Note: This is Main screen, top bar, background color of full width (farthest back depth-wise) */
         body, #header{
-        background-color:""" + self.config.color_b + """;
+        background-color:""" + self.var.color_b + """;
         height:40px;
         }
 
         /* Note: This is Main screen, top bar, curved card */
         curvedcard, #header{
-        background-color:"""+ self.config.color_c +""";
-        border-color:"""+ self.config.color_c +""";
+        background-color:"""+ self.var.color_c +""";
+        border-color:"""+ self.var.color_c +""";
         border-radius: 0 0 10px 10px;
         margin-top: 0;
         padding:0 10px 0 10px;
@@ -64,7 +101,7 @@ class SharedStyles(Style):
 
         /* Note: This is Main screen, top bar, text color of buttons (color) and background color of buttons (background-color). background-color should be same as in curvedcard */
         .hitem{
-        background-color:""" + self.config.color_c + """;
+        background-color:""" + self.var.color_c + """;
         color:#888;
         font-family:""" + customFont + """;
         font-weight:normal;
@@ -73,7 +110,7 @@ class SharedStyles(Style):
         }
         .hitem:hover{
         text-decoration: none;
-        color:""" + self.config.color_p + """;
+        color:""" + self.var.color_p + """;
         }
         """
 
@@ -147,8 +184,8 @@ class SharedStyles(Style):
     @css
     def body_colors(self):
         """Generate and return CSS style of class "card"."""
-        return (" body {    color:" + self.config.color_t + "!important;" +
-                "background-color:" + self.config.color_b + "!important}")
+        return (" body {    color:" + self.var.color_t + "!important;" +
+                "background-color:" + self.var.color_b + "!important}")
 
     @css
     def user_color_map(self):
@@ -177,7 +214,10 @@ class ButtonsStyle(Style):
 
     @css
     def qt(self):
-        return self.advanced_qt() + (self.qt_scrollbars if self.config.style_scroll_bars else '')
+        return palette_aware(
+            self.advanced_qt() + (self.qt_scrollbars if self.config.style_scroll_bars else ''),
+            self.config
+        )
 
     # Note: This is the Browse button style
     # First is idle state. Second is hover. Third is clicked.
@@ -292,8 +332,8 @@ class ButtonsStyle(Style):
         button
         {{
             { self.idle }
-            background:{self.config.color_c};
-            border:0px {self.config.color_c};
+            background:{self.var.color_c};
+            border:0px {self.var.color_c};
             margin: 8px;
             border-radius: 40px;
             font-family:%s;
@@ -303,13 +343,13 @@ class ButtonsStyle(Style):
         button:hover
         {{
             { self.hover }
-            background-color:{self.config.color_p};
-            border-color:{self.config.color_p};
+            background-color:{self.var.color_p};
+            border-color:{self.var.color_p};
         }}
         button:active
         {{
             { self.active }
-            background:{self.config.color_p};
+            background:{self.var.color_p};
         }}
             """ %(customFont) + (self.scrollbars if self.config.style_scroll_bars else '')
 
@@ -323,7 +363,7 @@ class ButtonsStyle(Style):
                 { self.idle }
                 width:auto;
                 height:auto;
-                background:{self.config.color_c};
+                background:{self.var.color_c};
                 border:1px solid #bdbdbd;
                 margin:2px;
                 padding: 4px 8px 4px 8px;
@@ -351,8 +391,8 @@ class DeckStyle(Style):
         #header
         {
             color:#000!important;
-            background:""" + self.config.color_b + """;
-            border-top-color:""" + self.config.color_b + """;
+            background:""" + self.var.color_b + """;
+            border-top-color:""" + self.var.color_b + """;
             height:40px
         }
         """
@@ -372,7 +412,7 @@ class DeckStyle(Style):
             text-transform: none;
             font-size: 15px;
             color:#212121;
-            background-color:""" + self.config.color_b + """;
+            background-color:""" + self.var.color_b + """;
             border-radius: 50px;
             font-family:""" + customFont + """;
             padding:6px 12px 6px 12px;
@@ -381,9 +421,9 @@ class DeckStyle(Style):
         a.deck:hover {
             text-decoration: none;
             color:#fff;
-            background-color:""" + self.config.color_p + """;
+            background-color:""" + self.var.color_p + """;
             border-radius: 50px;
-            border-color:""" + self.config.color_p + """;
+            border-color:""" + self.var.color_p + """;
             width: auto;
             height: auto;
             padding:6px 16px 6px 16px;
@@ -391,7 +431,7 @@ class DeckStyle(Style):
 
         tr.deck td{
             height:35px;
-            border-bottom-color:""" + self.config.color_b + """;
+            border-bottom-color:""" + self.var.color_b + """;
             font-family:""" + customFont + """;
             border-radius: 50px;
         }
@@ -435,7 +475,7 @@ class DeckStyle(Style):
         /* highlight of currently selected deck in list */
         .current {
             text-decoration: none;
-            background-color:""" + self.config.color_b + """;
+            background-color:""" + self.var.color_b + """;
             border-radius: 50px;
         }
 
@@ -471,7 +511,7 @@ class MessageBoxStyle(Style):
         Generate and return CSS style of class QMessageBox,
         using global color declarations
         """
-        return f"""
+        style = f"""
         QMessageBox,QLabel
         {{
             color: { self.config.color_t };
@@ -484,14 +524,16 @@ class MessageBoxStyle(Style):
             min-width: 70px
         }}
         """ % (customFont)
+        return palette_aware(style, self.config)
 
 
 class ImageStyle(Style):
 
+    # images which were inverted ahead (see ImageInverter) are marked
     @css
     def invert(self):
         return """
-        img
+        img:not([data-redesign-inverted])
         {
             filter:invert(1);
             -webkit-filter:invert(1)
@@ -521,7 +563,7 @@ class DialogStyle(Style):
 
     @css
     def style(self):
-        return """
+        return palette_aware("""
             QDialog,QLabel,QListWidget,QFontComboBox,QCheckBox,QSpinBox,QRadioButton,QHBoxLayout
             {
             """ + self.shared.colors + """
@@ -556,4 +598,4 @@ class DialogStyle(Style):
                 subcontrol-position:top left;
                 margin-top:-7px
             }
-            """ + self.buttons.advanced_qt("QTabWidget")
+            """ + self.buttons.advanced_qt("QTabWidget"), self.config)
@@ -0,0 +1,74 @@
+from hashlib import sha1
+from os import listdir, makedirs, remove
+from os.path import dirname, abspath, join
+
+
+class ExternalStylesheets:
+    """Stylesheets served to webviews as files, by the Anki media server.
+
+    Each css is written once to user_files/web, under a name containing
+    a hash of its content, and linked with <link rel="stylesheet">.
+    Since the address changes whenever the content does, QtWebEngine can
+    keep the parsed stylesheet cached across page loads and webviews.
+
+    Requires web exports of add-ons (Anki 2.1.13+); if they are not
+    available, or a file cannot be written, styles are inlined instead.
+    """
+
+    directory = 'user_files/web'
+
+    def __init__(self, app, mw):
+        self.app = app
+        self.mw = mw
+        self.path = join(dirname(abspath(__file__)), *self.directory.split('/'))
+        self.add_on = None
+        # links by (name, css)
+        self.hrefs = {}
+        # files used in this session
+        self.used = set()
+
+    @property
+    def available(self):
+        return self.add_on is not None and self.app.config.link_stylesheets.value
+
+    def register(self):
+        """Allow the media server to serve the stylesheets."""
+        add_on_manager = getattr(self.mw, 'addonManager', None)
+        if not hasattr(add_on_manager, 'setWebExports') or not hasattr(self.mw, 'serverURL'):
+            return
+        # also inverted images (see ImageInverter)
+        add_on_manager.setWebExports(__name__, self.directory + r'/.*\.(css|png)')
+        self.add_on = add_on_manager.addonFromModule(__name__)
+        makedirs(self.path, exist_ok=True)
+
+    def href(self, name, css):
+        """Address of a file with given css, or None if it cannot be served."""
+        if not self.available:
+            return None
+
+        key = (name, css)
+        if key in self.hrefs:
+            return self.hrefs[key]
+
+        file_name = name + '-' + sha1(css.encode()).hexdigest()[:16] + '.css'
+        try:
+            with open(join(self.path, file_name), 'w', encoding='utf-8') as f:
+                f.write(css)
+        except OSError:
+            return None
+
+        self.used.add(file_name)
+        href = self.mw.serverURL() + '_addons/' + self.add_on + '/' + self.directory + '/' + file_name
+        self.hrefs[key] = href
+        return href
+
+    def prune(self):
+        """Remove files which were not used in this session."""
+        if self.add_on is None:
+            return
+        for file_name in listdir(self.path):
+            if file_name.endswith('.css') and file_name not in self.used:
+                try:
+                    remove(join(self.path, file_name))
+                except OSError:
+                    pass
@@ -19,6 +19,7 @@ from anki import version as anki_version
 
 from aqt.qt import *
 from aqt import mw
+from aqt.reviewer import Reviewer
 
 __version__ = '1.3.0'
 
@@ -37,6 +38,10 @@ includeNewAfterRevs = False
 # Limit count to your review settings as opposed to deck overall
 limitToReviewSettings = True
 
+# Card counts are taken from the scheduler when the deck overview opens and then
+# updated as you answer cards. Re-count them after this many answers (0 = never).
+resyncInterval = 50
+
 # PROGRESS BAR APPEARANCE
 
 showPercent = True # Show the progress text percentage or not.
@@ -80,6 +85,13 @@ progressBar = None
 mx = 0
 limitedBarLength = 0
 
+# Card counts, updated incrementally while reviewing
+revCount = 0
+newCount = 0
+countsDeck = None # Id of the deck the counts were taken for.
+countsStale = True
+answersSinceSync = 0
+
 pbdStyle = QStyleFactory.create("%s" % (pbStyle)) # Don't touch.
 
 #Defining palette in case needed for custom colors with themes.
@@ -205,36 +217,84 @@ def pb():
     return progressBar, mx
 
 
+def _syncCounts():
+    """Take review and new card counts from the scheduler (SQL queries over the deck tree)."""
+    global revCount, newCount, countsDeck, countsStale, answersSinceSync
+    revCount = newCount = 0
+    if includeRev:
+        revCount = mw.col.sched.totalRevForCurrentDeck()
+    if includeNew or includeNewAfterRevs:
+        newCount = mw.col.sched.totalNewForCurrentDeck()
+    countsDeck = mw.col.decks.selected()
+    countsStale = False
+    answersSinceSync = 0
+
+
+def _markCountsStale(*args):
+    """Counts will be taken from the scheduler again on next use."""
+    global countsStale
+    countsStale = True
+
+
+def _onAnswerCard(reviewer, ease):
+    """Update counts before the answered card leaves its queue."""
+    global revCount, newCount, answersSinceSync
+    card = reviewer.card
+    if reviewer.state != "answer" or not card:
+        return
+    # the same checks as in Reviewer._answerCard, which ignores invalid answers
+    if mw.state != "review" or mw.col.sched.answerButtons(card) < ease:
+        return
+    if card.queue == 0:
+        newCount = max(0, newCount - 1)
+    elif card.queue == 2:
+        revCount = max(0, revCount - 1)
+    # learning cards are counted by the scheduler itself (lrnCount)
+    answersSinceSync += 1
+
+
 def getMX():
     """Get deck's card counts for progress bar updates."""
+    if (countsStale or countsDeck != mw.col.decks.selected()
+            or (resyncInterval and answersSinceSync >= resyncInterval)):
+        _syncCounts()
     rev = nu = lrn = 0
     if includeRev:
-        rev = mw.col.sched.totalRevForCurrentDeck()
+        rev = revCount
     if includeLrn:
         try:
             lrn = mw.col.sched.lrnCount
         except AttributeError:
             pass
     if includeNew or (includeNewAfterRevs and rev == 0):
-        nu = mw.col.sched.totalNewForCurrentDeck()
+        nu = newCount
     total = rev + nu + lrn
     return total
 
+def _getLimitedCounts():
+    """Get (rev, lrn, new) cards left for today in the selected deck and its children.
+
+    The scheduler computes these (with daily limits) for the selected deck's
+    subtree only, when the overview resets it, so there is no need to build
+    due counts for every deck of the collection with deckDueList().
+    """
+    nu, lrn, rev = mw.col.sched.counts()[:3]
+    return rev, lrn, nu
+
 def _getLimitedBarLength():
     """ Get a new bar length based off the number of new / lrn / rev cards you have left for the day """
     global limitedBarLength
-    active_decks = mw.col.decks.active()
-    if len(active_decks) > 0:
+    if mw.col.decks.active():
         rev = lrn = nu = 0
 
         # get number of cards
-        for tree in [deck for deck in mw.col.sched.deckDueList() if deck[1] in active_decks]:
-            if includeRev:
-                rev += tree[2]
-            if includeLrn:
-                lrn += tree[3]
-            if includeNew or (includeNewAfterRevs and rev == 0):
-                nu += tree[4]
+        dueRev, dueLrn, dueNew = _getLimitedCounts()
+        if includeRev:
+            rev = dueRev
+        if includeLrn:
+            lrn = dueLrn
+        if includeNew or (includeNewAfterRevs and rev == 0):
+            nu = dueNew
 
         if nu + rev < mx:
             limitedBarLength = nu+lrn+rev
@@ -276,6 +336,8 @@ def _updatePB():
 def _renderBar(state, oldState):
     global mx, progressBar
     if state == "overview":
+        # Counts are taken once, when the overview opens.
+        _markCountsStale()
         # Set up progress bar at deck's overview page: initialize or modify.
         if not progressBar: progressBar, mx = pb()
         else: rrenderPB()
@@ -294,10 +356,11 @@ def _renderBar(state, oldState):
 def rrenderPB():
     """Modify progress bar if it was already initialized."""
     global mx
-    if getMX() >= 1:
-        if mx > getMX(): _updatePB()
+    total = getMX()
+    if total >= 1:
+        if mx > total: _updatePB()
         else:
-            mx = getMX()
+            mx = total
             progressBar.setRange(0, mx)
             progressBar.reset()
     else: progressBar.setValue(mx)
@@ -306,6 +369,11 @@ def rrenderPB():
 addHook("afterStateChange", _renderBar)
 addHook("showQuestion", _updatePB)
 
+# Undo, burying, suspending, deleting and editing cards reset the main window.
+addHook("reset", _markCountsStale)
+addHook("revertedCard", _markCountsStale)
+Reviewer._answerCard = wrap(Reviewer._answerCard, _onAnswerCard, "before")
+
 
 if anki_version.startswith("2.0.x"):
     """Workaround for QSS issue in EditCurrent,